@@ -8,14 +8,34 @@ Descripción:
 - Usa clases Producto e Inventario.
 - Usa colecciones (dict, list, set, tuple) para optimizar búsquedas y operaciones.
 - Persiste todo en SQLite (inventario.db).
+- Sin argumentos abre el menú; con subcomandos se usa por lotes:
+    python inventario.py add < nuevos.csv
+    python inventario.py import --formato jsonl < catalogo.jsonl
+    python inventario.py export > respaldo.csv
+  (ver `python inventario.py -h`).
 Requisitos: Python 3.10+ (sin librerías externas).
 """
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from contextlib import contextmanager
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from array import array
+from bisect import bisect_left, insort
+import heapq
+import math
+import os
+import re
 import sqlite3
+import sys
+import unicodedata
 from datetime import datetime
+import argparse
+import csv
+import itertools
+import json
 
 # -------------------------------
 #  Utilidades
@@ -27,18 +47,40 @@ def now_iso() -> str:
 def normalize(s: str) -> str:
     return " ".join(s.strip().lower().split())
 
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
 def tokenize_name(name: str) -> List[str]:
-    """Tokeniza el nombre para el índice de búsqueda por palabras."""
-    sep = " "
-    clean = normalize(name).replace(",", sep).replace(".", sep).replace("-", sep).replace("_", sep).replace("/", sep)
-    tokens = [t for t in clean.split() if t]
-    return tokens
+    """
+    Tokeniza el nombre para el índice de búsqueda por palabras: letras y dígitos
+    en minúscula, todo lo demás separa. Es el único tokenizador: lo usan el índice
+    en memoria, la tabla productos_tokens y las consultas.
+    """
+    return _TOKEN_RE.findall(unicodedata.normalize("NFC", name).lower())
+
+def trigramas(token: str) -> Set[str]:
+    """Trigramas del token con bordes marcados ("$lá", "láp", ..., "iz$")."""
+    t = f"${token}$"
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """Levenshtein con corte temprano: devuelve maximo + 1 si se pasa de `maximo`."""
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > maximo:
+            return maximo + 1
+        prev = cur
+    return prev[-1]
 
 # -------------------------------
 #  Modelo: Producto
 # -------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class Producto:
     """
     Representa un producto del inventario.
@@ -85,6 +127,190 @@ class Producto:
     def from_row(row: Tuple) -> "Producto":
         return Producto(id=row[0], nombre=row[1], cantidad=row[2], precio=row[3])
 
+# -------------------------------
+#  Cache perezoso de productos
+# -------------------------------
+
+class ProductosPerezosos(MutableMapping):
+    """
+    Reemplazo de Dict[int, Producto] para el modo lazy de Inventario.
+    Conoce todos los ids, pero sólo mantiene en memoria los últimos
+    `capacidad` productos usados (LRU); el resto se lee de SQLite al pedirlo.
+    """
+
+    COLUMNAS = "id, nombre, cantidad, precio, created_at, updated_at"
+
+    def __init__(self, conn: sqlite3.Connection, capacidad: int = 10_000) -> None:
+        self.conn = conn
+        self.capacidad = capacidad
+        self.ids: Set[int] = set()
+        self._lru: "OrderedDict[int, Producto]" = OrderedDict()
+
+    def _guardar(self, p: Producto) -> None:
+        self._lru[p.id] = p
+        self._lru.move_to_end(p.id)
+        while len(self._lru) > self.capacidad:
+            self._lru.popitem(last=False)
+
+    def __getitem__(self, pid: int) -> Producto:
+        p = self._lru.get(pid)
+        if p is not None:
+            self._lru.move_to_end(pid)
+            return p
+        if pid not in self.ids:
+            raise KeyError(pid)
+        row = self.conn.execute(f"SELECT {self.COLUMNAS} FROM productos WHERE id = ?", (pid,)).fetchone()
+        if row is None:
+            raise KeyError(pid)
+        p = Producto.from_row(row)
+        self._guardar(p)
+        return p
+
+    def __setitem__(self, pid: int, p: Producto) -> None:
+        self.ids.add(pid)
+        self._guardar(p)
+
+    def __delitem__(self, pid: int) -> None:
+        self.ids.remove(pid)
+        self._lru.pop(pid, None)
+
+    def __contains__(self, pid: object) -> bool:
+        return pid in self.ids
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def clear(self) -> None:
+        self.ids.clear()
+        self._lru.clear()
+
+    def descartar(self, pids: Iterable[int]) -> None:
+        """Saca esos ids (y su copia en el LRU) sin leer la BD."""
+        for pid in pids:
+            self.ids.discard(pid)
+            self._lru.pop(pid, None)
+
+    def varios(self, pids: List[int]) -> List[Producto]:
+        """
+        Los productos de `pids` en ese orden (se saltean los que no existen). Los que
+        no están en el LRU se leen de a 500 por consulta y no se guardan en él.
+        """
+        leidos: Dict[int, Producto] = {}
+        faltan = [pid for pid in pids if pid not in self._lru and pid in self.ids]
+        for i in range(0, len(faltan), 500):
+            chunk = faltan[i:i + 500]
+            marcas = ",".join("?" * len(chunk))
+            for row in self.conn.execute(f"SELECT {self.COLUMNAS} FROM productos WHERE id IN ({marcas})", chunk):
+                leidos[row[0]] = Producto.from_row(row)
+        return [p for p in (self._lru.get(pid) or leidos.get(pid) for pid in pids) if p is not None]
+
+    def values(self) -> Iterator[Producto]:  # type: ignore[override]
+        """Recorre todos los productos en orden de id leyendo de SQLite (no llena el LRU)."""
+        for row in self.conn.execute(f"SELECT {self.COLUMNAS} FROM productos ORDER BY id"):
+            yield self._lru.get(row[0]) or Producto.from_row(row)
+
+# -------------------------------
+#  Almacenamiento compacto
+# -------------------------------
+
+class ProductosCompactos(MutableMapping):
+    """
+    Reemplazo de Dict[int, Producto] que guarda los productos por columnas:
+    ids ordenados (array 'q'), cantidades (array 'q'), precios (array 'd') y
+    nombres internados en una lista. Un producto ocupa ~30 bytes + su nombre en
+    vez de un objeto más una entrada de dict.
+
+    Cada lectura arma un Producto nuevo: modificarlo no cambia lo guardado
+    (Inventario siempre escribe de vuelta con productos[id] = nuevo).
+    Los borrados dejan un hueco (nombre None) que se compacta cuando los
+    huecos pasan de un cuarto del total.
+    """
+
+    def __init__(self) -> None:
+        self._ids = array("q")
+        self._cantidades = array("q")
+        self._precios = array("d")
+        self._nombres: List[Optional[str]] = []
+        self._huecos = 0
+
+    def _posicion(self, pid: object) -> int:
+        """Índice de `pid` en las columnas, o -1 si no está (o fue borrado)."""
+        if not isinstance(pid, int): return -1
+        i = bisect_left(self._ids, pid)
+        if i < len(self._ids) and self._ids[i] == pid and self._nombres[i] is not None:
+            return i
+        return -1
+
+    def __getitem__(self, pid: int) -> Producto:
+        i = self._posicion(pid)
+        if i < 0:
+            raise KeyError(pid)
+        return Producto(pid, self._nombres[i], self._cantidades[i], self._precios[i])
+
+    def __setitem__(self, pid: int, p: Producto) -> None:
+        nombre = sys.intern(p.nombre)
+        ids = self._ids
+        if not ids or pid > ids[-1]:
+            # caso normal: los ids nuevos son mayores que los existentes
+            ids.append(pid)
+            self._cantidades.append(p.cantidad)
+            self._precios.append(p.precio)
+            self._nombres.append(nombre)
+            return
+        i = bisect_left(ids, pid)
+        if i < len(ids) and ids[i] == pid:
+            if self._nombres[i] is None: self._huecos -= 1
+            self._cantidades[i] = p.cantidad
+            self._precios[i] = p.precio
+            self._nombres[i] = nombre
+            return
+        ids.insert(i, pid)
+        self._cantidades.insert(i, p.cantidad)
+        self._precios.insert(i, p.precio)
+        self._nombres.insert(i, nombre)
+
+    def __delitem__(self, pid: int) -> None:
+        i = self._posicion(pid)
+        if i < 0:
+            raise KeyError(pid)
+        self._nombres[i] = None
+        self._huecos += 1
+        if self._huecos > 1024 and self._huecos * 4 > len(self._ids):
+            self._compactar()
+
+    def _compactar(self) -> None:
+        vivos = [i for i, n in enumerate(self._nombres) if n is not None]
+        self._ids = array("q", (self._ids[i] for i in vivos))
+        self._cantidades = array("q", (self._cantidades[i] for i in vivos))
+        self._precios = array("d", (self._precios[i] for i in vivos))
+        self._nombres = [self._nombres[i] for i in vivos]
+        self._huecos = 0
+
+    def __contains__(self, pid: object) -> bool:
+        return self._posicion(pid) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        for pid, nombre in zip(self._ids, self._nombres):
+            if nombre is not None: yield pid
+
+    def __len__(self) -> int:
+        return len(self._ids) - self._huecos
+
+    def clear(self) -> None:
+        self._ids = array("q")
+        self._cantidades = array("q")
+        self._precios = array("d")
+        self._nombres = []
+        self._huecos = 0
+
+    def values(self) -> Iterator[Producto]:  # type: ignore[override]
+        """Recorre los productos en orden de id."""
+        for pid, nombre, cantidad, precio in zip(self._ids, self._nombres, self._cantidades, self._precios):
+            if nombre is not None: yield Producto(pid, nombre, cantidad, precio)
+
 # -------------------------------
 #  Repositorio + Servicio: Inventario
 # -------------------------------
@@ -94,10 +320,30 @@ class Inventario:
     Maneja el cache en memoria (colecciones) y la persistencia en SQLite.
     - Colecciones:
         * self.productos: Dict[int, Producto]
-        * self.index_nombre: Dict[str, Set[int]]
+        * self.index_nombre: Dict[str, Set[int]]       (token -> ids)
+        * self._tokens_ordenados: List[str]            (tokens del índice, ordenados; búsqueda por prefijo)
+        * self._trigramas: Dict[str, Set[str]]         (trigrama -> tokens; búsqueda difusa)
+    - El índice de nombres también vive en SQLite (tabla productos_tokens, con
+      los mismos tokens); index_nombre se carga desde ahí sin volver a tokenizar.
+    - lazy=True: al iniciar sólo se leen los ids; self.productos es un
+      ProductosPerezosos que hidrata los Producto a demanda y guarda a lo sumo
+      `max_cache` en memoria, y buscar_por_nombre consulta productos_tokens
+      (sin fuzzy). lazy=True con indice_en_memoria=True carga además el índice
+      (fuzzy disponible), y ese arranque vuelve a ser O(n).
+    - Totales (productos, unidades, valor del stock) se mantienen en cada
+      alta/cambio/baja: resumen() es O(1). El resto de la analítica
+      (stock_bajo, histograma_precios, top_por_valor) se resuelve en SQLite.
+    - Otros procesos pueden escribir en el mismo archivo: los triggers anotan
+      cada id tocado en productos_cambios y refrescar() (llamado al inicio de
+      cada operación) relee sólo esos ids cuando PRAGMA data_version indica
+      que hubo commits de otra conexión.
+    - compacto=True: self.productos es un ProductosCompactos (columnas en
+      arrays) y cada token de index_nombre apunta a un array('q') ordenado de
+      ids en vez de un set. Misma API; pensado para millones de productos.
     """
 
-    def __init__(self, db_path: str = "inventario.db") -> None:
+    def __init__(self, db_path: str = "inventario.db", lazy: bool = False, max_cache: int = 10_000,
+                 indice_en_memoria: Optional[bool] = None, compacto: bool = False) -> None:
         self.db_path = db_path
         self.conn = sqlite3.connect(self.db_path)
         self.conn.execute("PRAGMA foreign_keys = ON")
@@ -106,8 +352,26 @@ class Inventario:
 
         self._create_schema()
 
-        self.productos: Dict[int, Producto] = {}
-        self.index_nombre: Dict[str, Set[int]] = {}
+        self.lazy = lazy
+        # sin lazy siempre hay índice en memoria; con lazy, sólo si se pide
+        self.indice_en_memoria = not lazy or bool(indice_en_memoria)
+        self.compacto = compacto
+        self.productos: MutableMapping[int, Producto]
+        if lazy:
+            self.productos = ProductosPerezosos(self.conn, max_cache)
+        elif compacto:
+            self.productos = ProductosCompactos()
+        else:
+            self.productos = {}
+        # token -> ids: Set[int], o array('q') ordenado en modo compacto
+        self.index_nombre: Dict[str, Set[int] | array] = {}
+        self._tokens_ordenados: List[str] = []
+        self._trigramas: Dict[str, Set[str]] = {}
+        self._tx_tocados: Optional[Set[int]] = None   # ids modificados en la transacción abierta
+        self._unidades = 0          # suma de cantidades
+        self._version_datos = -1    # PRAGMA data_version visto la última vez
+        self._ultimo_cambio = 0     # seq de productos_cambios ya aplicado al cache
+        self._valor = 0.0           # suma de cantidad * precio
         self._load_cache()
 
     def _create_schema(self) -> None:
@@ -125,33 +389,399 @@ class Inventario:
             """
         )
         cur.execute("CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos (nombre)")
+        # para stock_bajo() y top_por_valor()
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_productos_cantidad ON productos (cantidad)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_productos_valor ON productos (cantidad * precio)")
+
+        # Índice de nombres persistido: (token, id) tokenizados con tokenize_name,
+        # el mismo tokenizador que el índice en memoria. SQL no puede tokenizar,
+        # así que los triggers sólo anotan los ids tocados (también por escrituras
+        # hechas fuera de esta clase) y _indexar_pendientes() los re-tokeniza.
+        existe = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'productos_tokens'"
+        ).fetchone()
+        cur.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS productos_tokens (
+                token TEXT NOT NULL,
+                producto_id INTEGER NOT NULL,
+                PRIMARY KEY (token, producto_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_productos_tokens_id ON productos_tokens (producto_id);
+            CREATE TABLE IF NOT EXISTS productos_tokens_pendientes (producto_id INTEGER PRIMARY KEY);
+            CREATE TRIGGER IF NOT EXISTS productos_tokens_ai AFTER INSERT ON productos BEGIN
+                INSERT OR IGNORE INTO productos_tokens_pendientes VALUES (new.id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS productos_tokens_ad AFTER DELETE ON productos BEGIN
+                INSERT OR IGNORE INTO productos_tokens_pendientes VALUES (old.id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS productos_tokens_au AFTER UPDATE OF id, nombre ON productos BEGIN
+                INSERT OR IGNORE INTO productos_tokens_pendientes VALUES (old.id);
+                INSERT OR IGNORE INTO productos_tokens_pendientes VALUES (new.id);
+            END;
+            -- versión anterior del índice (FTS5, con otro tokenizador)
+            DROP TRIGGER IF EXISTS productos_fts_ai;
+            DROP TRIGGER IF EXISTS productos_fts_ad;
+            DROP TRIGGER IF EXISTS productos_fts_au;
+            DROP TABLE IF EXISTS productos_fts_vocab;
+            DROP TABLE IF EXISTS productos_fts;
+            """
+        )
+        if not existe:
+            # BD creada antes del índice: se indexan las filas existentes una vez
+            cur.execute("INSERT OR IGNORE INTO productos_tokens_pendientes SELECT id FROM productos")
+
+        # Registro de cambios para que cada proceso refresque sólo lo que otro tocó
+        cur.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS productos_cambios (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                producto_id INTEGER NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS productos_cambios_ai AFTER INSERT ON productos BEGIN
+                INSERT INTO productos_cambios (producto_id) VALUES (new.id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS productos_cambios_au AFTER UPDATE ON productos BEGIN
+                INSERT INTO productos_cambios (producto_id) VALUES (old.id);
+                INSERT INTO productos_cambios (producto_id) SELECT new.id WHERE new.id <> old.id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS productos_cambios_ad AFTER DELETE ON productos BEGIN
+                INSERT INTO productos_cambios (producto_id) VALUES (old.id);
+            END;
+            """
+        )
+        self._indexar_pendientes()
         self.conn.commit()
 
     def _load_cache(self) -> None:
         self.productos.clear()
         self.index_nombre.clear()
         cur = self.conn.cursor()
-        for row in cur.execute("SELECT id, nombre, cantidad, precio, created_at, updated_at FROM productos"):
-            p = Producto.from_row(row)
-            self.productos[p.id] = p
-            self._add_to_index(p)
+        # la marca se lee antes que los datos: lo que se escriba en el medio se
+        # vuelve a aplicar en el próximo refrescar() (releer un id es inocuo)
+        self._version_datos = cur.execute("PRAGMA data_version").fetchone()[0]
+        self._ultimo_cambio = cur.execute("SELECT coalesce(max(seq), 0) FROM productos_cambios").fetchone()[0]
+        self._unidades, self._valor = cur.execute(
+            "SELECT coalesce(sum(cantidad), 0), coalesce(sum(cantidad * precio), 0.0) FROM productos"
+        ).fetchone()
+        if self.lazy:
+            self.productos.ids.update(pid for (pid,) in cur.execute("SELECT id FROM productos"))
+        else:
+            # en orden de id: ProductosCompactos sólo agrega al final
+            for row in cur.execute("SELECT id, nombre, cantidad, precio, created_at, updated_at FROM productos ORDER BY id"):
+                p = Producto.from_row(row)
+                self.productos[p.id] = p
+        if self.indice_en_memoria:
+            # en el orden de la PK (sin sort): cada token es un grupo contiguo y
+            # los arrays del modo compacto quedan ordenados
+            filas = cur.execute("SELECT token, producto_id FROM productos_tokens ORDER BY token, producto_id")
+            for tok, grupo in itertools.groupby(filas, key=lambda fila: fila[0]):
+                ids = (array("q", [pid for _, pid in grupo]) if self.compacto
+                       else {pid for _, pid in grupo})
+                self.index_nombre[sys.intern(tok)] = ids
+        self._rebuild_token_index()
+
+    def _indexar_pendientes(self) -> None:
+        """
+        Re-tokeniza en productos_tokens los ids que los triggers anotaron en
+        productos_tokens_pendientes (altas, bajas y renombres, propios o de otro
+        proceso). No hace COMMIT: corre dentro de la transacción de quien llama.
+        """
+        cur = self.conn.cursor()
+        ids = [pid for (pid,) in cur.execute("SELECT producto_id FROM productos_tokens_pendientes")]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marcas = ",".join("?" * len(chunk))
+            # sólo estos ids: otro proceso puede haber anotado más mientras tanto
+            cur.execute(f"DELETE FROM productos_tokens_pendientes WHERE producto_id IN ({marcas})", chunk)
+            cur.execute(f"DELETE FROM productos_tokens WHERE producto_id IN ({marcas})", chunk)
+            filas = cur.execute(f"SELECT id, nombre FROM productos WHERE id IN ({marcas})", chunk).fetchall()
+            cur.executemany(
+                "INSERT INTO productos_tokens (token, producto_id) VALUES (?, ?)",
+                [(tok, pid) for pid, nombre in filas for tok in dict.fromkeys(tokenize_name(nombre))],
+            )
+
+    def _rebuild_token_index(self) -> None:
+        """Reconstruye la lista ordenada y los trigramas a partir de index_nombre."""
+        self._tokens_ordenados = sorted(self.index_nombre)
+        self._trigramas = {}
+        for tok in self._tokens_ordenados:
+            for tri in trigramas(tok):
+                self._trigramas.setdefault(tri, set()).add(tok)
 
     def _add_to_index(self, p: Producto) -> None:
+        if not self.indice_en_memoria: return
         for tok in tokenize_name(p.nombre):
-            self.index_nombre.setdefault(tok, set()).add(p.id)
+            ids = self.index_nombre.get(tok)
+            if ids is None:
+                ids = self.index_nombre[tok] = array("q") if self.compacto else set()
+                self._registrar_token(tok)
+            if self.compacto:
+                if not ids or p.id > ids[-1]:
+                    ids.append(p.id)
+                else:
+                    i = bisect_left(ids, p.id)
+                    if ids[i] != p.id: ids.insert(i, p.id)
+            else:
+                ids.add(p.id)
 
     def _remove_from_index(self, p: Producto) -> None:
+        if not self.indice_en_memoria: return
         for tok in tokenize_name(p.nombre):
             ids = self.index_nombre.get(tok)
             if ids:
-                ids.discard(p.id)
+                if self.compacto:
+                    i = bisect_left(ids, p.id)
+                    if i < len(ids) and ids[i] == p.id: del ids[i]
+                else:
+                    ids.discard(p.id)
                 if not ids:
                     self.index_nombre.pop(tok, None)
+                    self._olvidar_token(tok)
+
+    def _quitar_del_indice(self, ids: Set[int]) -> None:
+        """Saca `ids` de todas las listas del índice sin conocer sus nombres (una pasada)."""
+        vacios = []
+        for tok, lista in self.index_nombre.items():
+            if self.compacto:
+                for pid in ids:
+                    i = bisect_left(lista, pid)
+                    if i < len(lista) and lista[i] == pid: del lista[i]
+            elif not lista.isdisjoint(ids):
+                lista -= ids
+            if not lista:
+                vacios.append(tok)
+        for tok in vacios:
+            del self.index_nombre[tok]
+            self._olvidar_token(tok)
 
     def _update_index(self, old: Producto, new: Producto) -> None:
         self._remove_from_index(old)
         self._add_to_index(new)
 
+    def _registrar_token(self, tok: str) -> None:
+        insort(self._tokens_ordenados, tok)
+        for tri in trigramas(tok):
+            self._trigramas.setdefault(tri, set()).add(tok)
+
+    def _olvidar_token(self, tok: str) -> None:
+        i = bisect_left(self._tokens_ordenados, tok)
+        if i < len(self._tokens_ordenados) and self._tokens_ordenados[i] == tok:
+            del self._tokens_ordenados[i]
+        for tri in trigramas(tok):
+            toks = self._trigramas.get(tri)
+            if toks:
+                toks.discard(tok)
+                if not toks:
+                    self._trigramas.pop(tri, None)
+
+    # ---------- Búsqueda en el índice ----------
+    def _tokens_con_prefijo(self, prefijo: str) -> Iterable[str]:
+        i = bisect_left(self._tokens_ordenados, prefijo)
+        while i < len(self._tokens_ordenados) and self._tokens_ordenados[i].startswith(prefijo):
+            yield self._tokens_ordenados[i]
+            i += 1
+
+    def _tokens_similares(self, token: str) -> List[str]:
+        """Tokens a distancia de edición <= 1 (<= 2 si el token tiene más de 6 letras)."""
+        maximo = 1 if len(token) <= 6 else 2
+        tris = trigramas(token)
+        comunes: Dict[str, int] = {}
+        for tri in tris:
+            for tok in self._trigramas.get(tri, ()):
+                comunes[tok] = comunes.get(tok, 0) + 1
+        # cada edición cambia a lo sumo 3 trigramas
+        minimo = max(1, len(tris) - 3 * maximo)
+        return [tok for tok, n in comunes.items()
+                if n >= minimo and distancia_edicion(token, tok, maximo) <= maximo]
+
+    # peso de cada forma de coincidencia al rankear
+    PESO_EXACTO = 1.0
+    PESO_PREFIJO = 0.75
+    PESO_DIFUSO = 0.5
+    PESO_CONTIENE = 0.4
+
+    def _tokens_para(self, token: str, fuzzy: bool) -> List[Tuple[str, float]]:
+        """
+        Tokens del índice que corresponden a un token de la consulta, con su peso:
+        por prefijo (el exacto pesa más); si no hay y `fuzzy`, los parecidos por
+        trigramas + distancia de edición; y si tampoco, los que lo contienen
+        (ver _tokens_que_contienen).
+        """
+        encontrados = [(t, self.PESO_EXACTO if t == token else self.PESO_PREFIJO)
+                       for t in self._tokens_con_prefijo(token)]
+        if not encontrados and fuzzy:
+            encontrados = [(t, self.PESO_DIFUSO) for t in self._tokens_similares(token)]
+        if not encontrados:
+            encontrados = [(t, self.PESO_CONTIENE) for t in self._tokens_que_contienen(token)]
+        return encontrados
+
+    def _tokens_que_contienen(self, token: str) -> List[str]:
+        """
+        Tokens del índice que contienen a `token` (de 3 letras o más; más cortos
+        coinciden con casi todo). Un token que lo contiene tiene todos sus
+        trigramas interiores: se intersectan esos conjuntos, el más chico primero,
+        en vez de recorrer todo el vocabulario.
+        """
+        if len(token) < 3:
+            return []
+        conjuntos = sorted((self._trigramas.get(token[i:i + 3], set()) for i in range(len(token) - 2)), key=len)
+        candidatos = set(conjuntos[0])
+        for otros in conjuntos[1:]:
+            if not candidatos: break
+            candidatos &= otros
+        return sorted(t for t in candidatos if token in t)
+
+    # ---------- Cache ----------
+    def _registrar(self, p: Producto) -> None:
+        self.productos[p.id] = p
+        self._add_to_index(p)
+        self._unidades += p.cantidad
+        self._valor += p.cantidad * p.precio
+
+    def _olvidar(self, p: Producto) -> None:
+        self._remove_from_index(p)
+        self.productos.pop(p.id, None)
+        self._unidades -= p.cantidad
+        self._valor -= p.cantidad * p.precio
+
+    def _reemplazar(self, old: Producto, new: Producto) -> None:
+        if old.nombre != new.nombre: self._update_index(old, new)
+        self.productos[new.id] = new
+        self._unidades += new.cantidad - old.cantidad
+        self._valor += new.cantidad * new.precio - old.cantidad * old.precio
+
+    def _resync(self, ids: Iterable[int]) -> None:
+        """Vuelve a leer esos ids de la BD y deja el cache igual a lo que hay guardado."""
+        ids = list(ids)
+        if self.lazy:
+            # los tocados pueden haber salido del LRU: no se saben sus nombres ni
+            # sus cantidades viejas. Se sacan de las listas del índice en una
+            # pasada, se vuelven a agregar leídos de la BD y los totales se recalculan.
+            self.productos.descartar(ids)
+            if self.indice_en_memoria:
+                self._quitar_del_indice(set(ids))
+            cur = self.conn.cursor()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marcas = ",".join("?" * len(chunk))
+                for pid, nombre in cur.execute(f"SELECT id, nombre FROM productos WHERE id IN ({marcas})", chunk):
+                    self.productos.ids.add(pid)
+                    self._add_to_index(Producto(pid, nombre, 0, 0.0))
+            self._unidades, self._valor = cur.execute(
+                "SELECT coalesce(sum(cantidad), 0), coalesce(sum(cantidad * precio), 0.0) FROM productos"
+            ).fetchone()
+            return
+        for pid in ids:
+            p = self.productos.get(pid)
+            if p: self._olvidar(p)
+        cur = self.conn.cursor()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marcas = ",".join("?" * len(chunk))
+            for row in cur.execute(
+                f"SELECT id, nombre, cantidad, precio, created_at, updated_at FROM productos WHERE id IN ({marcas})",
+                chunk,
+            ):
+                self._registrar(Producto.from_row(row))
+
+    # ---------- Cambios de otros procesos ----------
+    # cuántas filas de productos_cambios se conservan; un proceso que quedó más
+    # atrás que eso recarga todo
+    CAMBIOS_MAX = 10_000
+
+    def refrescar(self) -> int:
+        """
+        Aplica al cache lo que otros procesos guardaron desde la última vez.
+        PRAGMA data_version sólo cambia con commits de otras conexiones, así que
+        si nadie más escribió cuesta una consulta trivial. Devuelve cuántos ids
+        se releyeron (-1 si hubo que recargar todo).
+        """
+        if self._tx_tocados is not None:
+            return 0   # dentro de una transacción propia el cache es el que vale
+        cur = self.conn.cursor()
+        version = cur.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version_datos:
+            return 0
+        self._version_datos = version
+        if cur.execute("SELECT 1 FROM productos_tokens_pendientes LIMIT 1").fetchone():
+            # otro proceso escribió con SQL directo: sus nombres se indexan acá
+            try:
+                self._indexar_pendientes()
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        primero = cur.execute("SELECT min(seq) FROM productos_cambios").fetchone()[0]
+        if primero is not None and primero > self._ultimo_cambio + 1:
+            # se podaron cambios que todavía no aplicamos
+            self._load_cache()
+            return -1
+        ids: Set[int] = set()
+        for seq, pid in cur.execute(
+            "SELECT seq, producto_id FROM productos_cambios WHERE seq > ? ORDER BY seq", (self._ultimo_cambio,)
+        ):
+            ids.add(pid)
+            self._ultimo_cambio = seq
+        if ids:
+            self._resync(ids)
+        return len(ids)
+
+    def _preparar_commit(self) -> None:
+        """
+        Antes de un COMMIT propio (con el lock de escritura tomado): indexa los
+        nombres tocados, poda el registro y, si nadie más escribió desde el último refrescar(), marca
+        nuestros propios cambios como ya aplicados.
+        """
+        self._indexar_pendientes()
+        cur = self.conn.cursor()
+        ultimo = cur.execute("SELECT max(seq) FROM productos_cambios").fetchone()[0]
+        if ultimo is None:
+            return
+        cur.execute("DELETE FROM productos_cambios WHERE seq <= ?", (ultimo - self.CAMBIOS_MAX,))
+        if cur.execute("PRAGMA data_version").fetchone()[0] == self._version_datos:
+            self._ultimo_cambio = ultimo
+
+    # ---------- Transacciones ----------
+    @contextmanager
+    def transaction(self) -> Iterator["Inventario"]:
+        """
+        Agrupa varias operaciones en un único COMMIT:
+
+            with inv.transaction():
+                inv.add_producto(...)
+                inv.actualizar_producto(...)
+
+        Si algo falla se hace ROLLBACK y los productos tocados se recargan desde
+        la BD, así el cache en memoria (productos + index_nombre) queda como antes.
+        Las transacciones anidadas se suman a la de afuera.
+        """
+        if self._tx_tocados is not None:
+            yield self
+            return
+        # IMMEDIATE: toma el lock de escritura desde el inicio (los ids que
+        # asigna add_many no pueden chocar con otro proceso)
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._tx_tocados = set()
+        try:
+            yield self
+            self._preparar_commit()
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            self._resync(self._tx_tocados)
+            raise
+        finally:
+            self._tx_tocados = None
+
+    def _commit(self, ids: Iterable[int]) -> None:
+        """COMMIT inmediato, o sólo anotar los ids si hay una transacción abierta."""
+        if self._tx_tocados is None:
+            self._preparar_commit()
+            self.conn.commit()
+        else:
+            self._tx_tocados.update(ids)
+
     # ---------- CRUD ----------
     def add_producto(self, p: Producto) -> Producto:
         if p.cantidad < 0 or p.precio < 0:
@@ -172,69 +802,264 @@ class Inventario:
                 "INSERT INTO productos (id, nombre, cantidad, precio, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
                 (p.id, p.nombre, p.cantidad, p.precio, ts, ts),
             )
-        self.conn.commit()
-        self.productos[p.id] = p
-        self._add_to_index(p)
+        self._commit((p.id,))
+        self._registrar(p)
         return p
 
     def eliminar_producto(self, id_producto: int) -> bool:
+        self.refrescar()
         p = self.productos.get(id_producto)
         if not p:
             return False
         cur = self.conn.cursor()
         cur.execute("DELETE FROM productos WHERE id = ?", (id_producto,))
-        self.conn.commit()
-        self._remove_from_index(p)
-        self.productos.pop(id_producto, None)
+        self._commit((id_producto,))
+        self._olvidar(p)
         return True
 
     def actualizar_producto(self, id_producto: int, nombre: Optional[str] = None, cantidad: Optional[int] = None, precio: Optional[float] = None) -> bool:
+        self.refrescar()
         p = self.productos.get(id_producto)
         if not p:
             return False
-        old = Producto(p.id, p.nombre, p.cantidad, p.precio)
-        if nombre is not None: p.set_nombre(nombre)
-        if cantidad is not None: p.set_cantidad(cantidad)
-        if precio is not None: p.set_precio(precio)
+        nuevo = self._con_cambios(p, nombre, cantidad, precio)
         cur = self.conn.cursor()
         cur.execute(
             "UPDATE productos SET nombre = ?, cantidad = ?, precio = ?, updated_at = ? WHERE id = ?",
-            (p.nombre, p.cantidad, p.precio, now_iso(), id_producto),
+            (nuevo.nombre, nuevo.cantidad, nuevo.precio, now_iso(), id_producto),
         )
-        self.conn.commit()
-        if old.nombre != p.nombre: self._update_index(old, p)
+        self._commit((id_producto,))
+        self._reemplazar(p, nuevo)
         return True
 
-    def buscar_por_nombre(self, consulta: str) -> List[Producto]:
-        consulta_norm = normalize(consulta)
-        if not consulta_norm: return []
-        tokens = tokenize_name(consulta_norm)
-        candidatos: Set[int] = set()
-        if tokens:
-            token_sets = [self.index_nombre.get(tok, set()) for tok in tokens]
-            if token_sets:
-                candidatos = token_sets[0].copy()
-                for s in token_sets[1:]: candidatos &= s
-        resultados: Dict[int, Producto] = {}
-        if not candidatos:
-            like = f"%{consulta_norm}%"
-            cur = self.conn.cursor()
-            for row in cur.execute(
-                "SELECT id, nombre, cantidad, precio, created_at, updated_at FROM productos WHERE lower(nombre) LIKE ?",
-                (like,),
-            ):
-                p = Producto.from_row(row)
-                resultados[p.id] = p
+    @staticmethod
+    def _con_cambios(p: Producto, nombre: Optional[str], cantidad: Optional[int], precio: Optional[float]) -> Producto:
+        """Copia de `p` con los cambios aplicados (valida con los setters de Producto)."""
+        nuevo = Producto(p.id, p.nombre, p.cantidad, p.precio)
+        if nombre is not None: nuevo.set_nombre(nombre)
+        if cantidad is not None: nuevo.set_cantidad(cantidad)
+        if precio is not None: nuevo.set_precio(precio)
+        return nuevo
+
+    # ---------- Operaciones por lote ----------
+    def add_many(self, productos: Iterable[Producto]) -> List[Producto]:
+        """
+        Inserta todos los productos con un executemany y un solo COMMIT.
+        Los que no traen id reciben ids consecutivos después del mayor existente.
+        Si alguno falla (id repetido, valores inválidos) no se guarda ninguno.
+        """
+        nuevos = list(productos)
+        for p in nuevos:
+            if not p.nombre.strip():
+                raise ValueError("El nombre no puede estar vacío.")
+            if p.cantidad < 0 or p.precio < 0:
+                raise ValueError("Cantidad y precio deben ser >= 0.")
+        if not nuevos:
+            return []
+        sin_id = [p for p in nuevos if p.id is None]
+        try:
+            with self.transaction():
+                cur = self.conn.cursor()
+                cur.execute(
+                    "SELECT max(coalesce((SELECT max(id) FROM productos), 0),"
+                    " coalesce((SELECT seq FROM sqlite_sequence WHERE name = 'productos'), 0))"
+                )
+                siguiente = max([cur.fetchone()[0]] + [p.id for p in nuevos if p.id is not None]) + 1
+                for p in sin_id:
+                    p.id = siguiente
+                    siguiente += 1
+                ts = now_iso()
+                self._tx_tocados.update(p.id for p in nuevos)
+                cur.executemany(
+                    "INSERT INTO productos (id, nombre, cantidad, precio, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(p.id, p.nombre, p.cantidad, p.precio, ts, ts) for p in nuevos],
+                )
+                for p in nuevos:
+                    self._registrar(p)
+        except BaseException:
+            for p in sin_id: p.id = None
+            raise
+        return nuevos
+
+    def update_many(self, cambios: Iterable[Tuple[int, Optional[str], Optional[int], Optional[float]]]) -> int:
+        """
+        Aplica (id, nombre, cantidad, precio) con un executemany y un solo COMMIT;
+        None deja el campo como está. Los ids inexistentes se ignoran.
+        Devuelve cuántos productos se actualizaron.
+        """
+        self.refrescar()
+        pares = []
+        for id_producto, nombre, cantidad, precio in cambios:
+            p = self.productos.get(id_producto)
+            if p:
+                pares.append((p, self._con_cambios(p, nombre, cantidad, precio)))
+        if not pares:
+            return 0
+        with self.transaction():
+            ts = now_iso()
+            self._tx_tocados.update(p.id for p, _ in pares)
+            self.conn.executemany(
+                "UPDATE productos SET nombre = ?, cantidad = ?, precio = ?, updated_at = ? WHERE id = ?",
+                [(n.nombre, n.cantidad, n.precio, ts, n.id) for _, n in pares],
+            )
+            for old, new in pares:
+                self._reemplazar(old, new)
+        return len(pares)
+
+    def delete_many(self, ids: Iterable[int]) -> int:
+        """Elimina los ids existentes con un executemany y un solo COMMIT; devuelve cuántos."""
+        self.refrescar()
+        borrar = [p for p in (self.productos.get(pid) for pid in dict.fromkeys(ids)) if p]
+        if not borrar:
+            return 0
+        with self.transaction():
+            self._tx_tocados.update(p.id for p in borrar)
+            self.conn.executemany("DELETE FROM productos WHERE id = ?", [(p.id,) for p in borrar])
+            for p in borrar:
+                self._olvidar(p)
+        return len(borrar)
+
+    def buscar_por_nombre(self, consulta: str, fuzzy: bool = False, limite: Optional[int] = None,
+                          cualquiera: bool = False) -> List[Producto]:
+        """
+        Busca en el índice en memoria (sin consultar SQLite) y devuelve los productos
+        ordenados por relevancia. Cada palabra de la consulta puede ser el inicio de
+        una palabra del nombre ("cuad" -> "cuaderno"); con fuzzy=True también tolera
+        errores de tipeo ("cuadreno").
+
+        El nombre tiene que coincidir con todas las palabras de la consulta; con
+        cualquiera=True alcanza con una ("cable usb" trae todos los cables y todos
+        los usb) y los que cubren más palabras van primero.
+
+        Relevancia: la suma, por palabra, de (peso de la coincidencia x IDF del
+        token), de modo que las palabras raras pesan más que las comunes. Con
+        `limite` sólo se arman los N mejores (heap), sin ordenar todos los candidatos.
+
+        Sin índice en memoria se usa productos_tokens (mismos tokens y mismo
+        ranking), pero sólo por prefijo: `fuzzy` se ignora.
+        """
+        self.refrescar()
+        tokens = list(dict.fromkeys(tokenize_name(consulta)))
+        if not tokens: return []
+        total = max(len(self.productos), 1)
+        puntaje: Optional[Dict[int, List[float]]] = None   # id -> [cobertura, peso]
+        for tok in tokens:
+            mejor: Dict[int, float] = {}
+            for peso, ids in self._coincidencias(tok, fuzzy):
+                w = peso * math.log(1 + total / len(ids))
+                for pid in ids:
+                    if w > mejor.get(pid, 0.0):
+                        mejor[pid] = w
+            if puntaje is None:
+                puntaje = {pid: [1, w] for pid, w in mejor.items()}
+                continue
+            if not cualquiera:
+                # todas las palabras: sólo siguen los que ya venían y también cubren ésta
+                puntaje = {pid: acc for pid, acc in puntaje.items() if pid in mejor}
+                if not puntaje: return []
+            for pid, w in mejor.items():
+                acc = puntaje.get(pid)
+                if acc is not None:
+                    acc[0] += 1
+                    acc[1] += w
+                elif cualquiera:
+                    puntaje[pid] = [1, w]
+        clave = lambda item: (item[1][0], item[1][1], -item[0])
+        if limite is not None:
+            mejores = heapq.nlargest(limite, puntaje.items(), key=clave)
         else:
-            for pid in candidatos:
-                p = self.productos.get(pid)
-                if p and consulta_norm in normalize(p.nombre):
-                    resultados[p.id] = p
-        return sorted(resultados.values(), key=lambda x: x.id or 0)
+            mejores = sorted(puntaje.items(), key=clave, reverse=True)
+        if self.lazy:
+            return self.productos.varios([pid for pid, _ in mejores])
+        return [self.productos[pid] for pid, _ in mejores if pid in self.productos]
+
+    def _coincidencias(self, token: str, fuzzy: bool) -> Iterable[Tuple[float, Collection[int]]]:
+        """(peso, ids) por cada token del índice que corresponde a un token de la consulta."""
+        if not self.indice_en_memoria:
+            return self._coincidencias_en_db(token)
+        return [(peso, self.index_nombre[t]) for t, peso in self._tokens_para(token, fuzzy)]
+
+    def _coincidencias_en_db(self, token: str) -> Iterator[Tuple[float, List[int]]]:
+        """Los tokens de productos_tokens que empiezan con `token`: un rango sobre la PK."""
+        cur = self.conn.execute(
+            "SELECT token, producto_id FROM productos_tokens WHERE token >= ? AND token < ? ORDER BY token",
+            (token, token + "\U0010ffff"),
+        )
+        for t, grupo in itertools.groupby(cur, key=lambda fila: fila[0]):
+            yield (self.PESO_EXACTO if t == token else self.PESO_PREFIJO), [pid for _, pid in grupo]
+
+    # ---------- Analítica ----------
+    def resumen(self) -> Dict[str, float]:
+        """Totales del inventario, mantenidos en cada operación (no recorre nada)."""
+        self.refrescar()
+        n = len(self.productos)
+        return {
+            "productos": n,
+            "unidades": self._unidades,
+            "valor_total": round(self._valor, 2),
+            "precio_promedio": round(self._valor / self._unidades, 2) if self._unidades else 0.0,
+        }
+
+    def stock_bajo(self, umbral: int = 5, limite: Optional[int] = None) -> List[Producto]:
+        """Productos con cantidad <= umbral, los más escasos primero (usa idx_productos_cantidad)."""
+        cur = self.conn.execute(
+            "SELECT id, nombre, cantidad, precio, created_at, updated_at FROM productos"
+            " WHERE cantidad <= ? ORDER BY cantidad, id LIMIT ?",
+            (umbral, -1 if limite is None else limite),
+        )
+        return [Producto.from_row(row) for row in cur]
+
+    def histograma_precios(self, cubetas: int = 10) -> List[Tuple[float, float, int]]:
+        """
+        Reparte los precios en `cubetas` rangos del mismo ancho entre el mínimo y
+        el máximo; devuelve (desde, hasta, cantidad de productos) por rango.
+        Un solo GROUP BY en SQLite.
+        """
+        if cubetas < 1:
+            raise ValueError("Debe haber al menos una cubeta.")
+        minimo, maximo = self.conn.execute("SELECT min(precio), max(precio) FROM productos").fetchone()
+        if minimo is None:
+            return []
+        ancho = (maximo - minimo) / cubetas or 1.0
+        conteo = dict(self.conn.execute(
+            "SELECT min(CAST((precio - ?) / ? AS INTEGER), ?) AS c, count(*) FROM productos GROUP BY c",
+            (minimo, ancho, cubetas - 1),
+        ))
+        return [(minimo + i * ancho, minimo + (i + 1) * ancho, conteo.get(i, 0)) for i in range(cubetas)]
+
+    def top_por_valor(self, n: int = 10) -> List[Tuple[Producto, float]]:
+        """Los `n` productos con mayor valor en stock (cantidad * precio), vía idx_productos_valor."""
+        cur = self.conn.execute(
+            "SELECT id, nombre, cantidad, precio, created_at, updated_at FROM productos"
+            " ORDER BY cantidad * precio DESC, id LIMIT ?",
+            (n,),
+        )
+        return [(p, p.cantidad * p.precio) for p in map(Producto.from_row, cur)]
 
     def mostrar_todos(self) -> List[Producto]:
+        self.refrescar()
         return sorted(self.productos.values(), key=lambda p: p.id or 0)
 
+    def iterar(self, offset: int = 0, limite: Optional[int] = None) -> Iterator[Producto]:
+        """
+        Recorre los productos en orden de id sin armar la lista: el cursor de
+        SQLite entrega las filas de a poco (la PK ya está ordenada).
+        """
+        if offset < 0 or (limite is not None and limite < 0):
+            raise ValueError("offset y límite deben ser >= 0.")
+        cur = self.conn.execute(
+            "SELECT id, nombre, cantidad, precio, created_at, updated_at FROM productos"
+            " ORDER BY id LIMIT ? OFFSET ?",
+            (-1 if limite is None else limite, offset),
+        )
+        cur.arraysize = 500
+        while True:
+            filas = cur.fetchmany()
+            if not filas:
+                return
+            for row in filas:
+                yield Producto.from_row(row)
+
     def close(self) -> None:
         try: self.conn.close()
         except Exception: pass
@@ -256,6 +1081,37 @@ def print_table(productos: List[Producto]) -> None:
     print("-+-".join("-" * w for w in col_widths))
     for r in rows: print(fmt_row(r))
 
+# anchos fijos del listado paginado (no dependen del contenido, así se
+# imprime cada página apenas se lee)
+ANCHOS = (8, 40, 8, 10)
+FILAS_POR_PAGINA = 50
+
+def print_paginado(productos: Iterable[Producto], filas_por_pagina: int = FILAS_POR_PAGINA,
+                   pausa: bool = False) -> int:
+    """
+    Imprime a medida que recorre `productos`, en páginas de ancho fijo con el
+    encabezado repetido; los nombres largos se recortan con "…". Con pausa=True
+    espera Enter entre páginas ("q" corta). Devuelve cuántos se mostraron.
+    """
+    if filas_por_pagina < 1:
+        raise ValueError("Las páginas deben tener al menos una fila.")
+    def fmt_row(cols: Tuple[str, str, str, str]) -> str:
+        celdas = [c if len(c) <= w else c[:w - 1] + "…" for c, w in zip(cols, ANCHOS)]
+        return " | ".join(c.rjust(w) if i in (0, 2, 3) else c.ljust(w)
+                          for i, (c, w) in enumerate(zip(celdas, ANCHOS)))
+    encabezado = fmt_row(("ID", "NOMBRE", "CANTIDAD", "PRECIO")) + "\n" + "-+-".join("-" * w for w in ANCHOS)
+    n = 0
+    for p in productos:
+        if n % filas_por_pagina == 0:
+            if n and pausa and input(f"-- {n} mostrados; Enter para seguir, q para salir -- ").strip().lower() == "q":
+                return n
+            print(encabezado if not n else "\n" + encabezado)
+        print(fmt_row((str(p.id), p.nombre, str(p.cantidad), f"{p.precio:.2f}")))
+        n += 1
+    if not n:
+        print("No hay productos para mostrar.")
+    return n
+
 def prompt_int(msg: str, allow_empty: bool = False) -> Optional[int]:
     while True:
         val = input(msg).strip()
@@ -281,8 +1137,8 @@ def prompt_str(msg: str, allow_empty: bool = False) -> Optional[str]:
         if not val: print("No puede estar vacío."); continue
         return val
 
-def menu() -> None:
-    inv = Inventario()
+def menu(db_path: str = "inventario.db") -> None:
+    inv = Inventario(db_path)
     if not inv.productos:
         print("Inicializando con datos de ejemplo...")
         inv.add_producto(Producto(None, "Lápiz HB", 100, 0.35))
@@ -329,9 +1185,10 @@ def menu() -> None:
                 except Exception as e: print(f"Error: {e}")
             elif opcion == "4":
                 q = prompt_str("Texto a buscar: ")
-                print_table(inv.buscar_por_nombre(q))
+                # si no hay coincidencias se reintenta tolerando errores de tipeo
+                print_table(inv.buscar_por_nombre(q, limite=50) or inv.buscar_por_nombre(q, fuzzy=True, limite=50))
             elif opcion == "5":
-                print_table(inv.mostrar_todos())
+                print_paginado(inv.iterar(), pausa=True)
             elif opcion == "6":
                 print("Saliendo... ¡Inventario en orden, capitán!"); break
             else:
@@ -339,5 +1196,291 @@ def menu() -> None:
     finally:
         inv.close()
 
+# -------------------------------
+#  Interfaz por lotes (argparse)
+# -------------------------------
+
+CAMPOS = ("id", "nombre", "cantidad", "precio")
+LOTE = 1000   # registros por transacción en add/update/delete/import
+
+def _leer_registros(entrada, formato: str, errores: List[Tuple[int, str]]) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    (línea, registro) de un CSV con encabezados o de JSON Lines. Las líneas que
+    no son un objeto JSON se anotan en `errores` y se sigue con la próxima.
+    """
+    if formato == "csv":
+        lector = csv.DictReader(entrada)
+        for reg in lector:
+            yield lector.line_num, reg
+    else:
+        for n, linea in enumerate(entrada, 1):
+            if not linea.strip():
+                continue
+            try:
+                reg = json.loads(linea)
+            except ValueError as e:
+                errores.append((n, f"JSON inválido: {e}"))
+                continue
+            if not isinstance(reg, dict):
+                errores.append((n, "El registro no es un objeto JSON."))
+                continue
+            yield n, reg
+
+def _campo(reg: Dict[str, str], nombre: str, tipo):
+    v = reg.get(nombre)
+    if v is None or (isinstance(v, str) and not v.strip()):
+        return None
+    return tipo(v)
+
+def _producto_de(reg: Dict[str, str]) -> Producto:
+    """Valida un registro completo (para altas) con los setters de Producto."""
+    nombre, cantidad, precio = _campo(reg, "nombre", str), _campo(reg, "cantidad", int), _campo(reg, "precio", float)
+    if nombre is None or cantidad is None or precio is None:
+        raise ValueError("Faltan nombre, cantidad o precio.")
+    p = Producto(_campo(reg, "id", int), "", 0, 0.0)
+    p.set_nombre(nombre); p.set_cantidad(cantidad); p.set_precio(precio)
+    return p
+
+def _cambio_de(reg: Dict[str, str]) -> Tuple[int, Optional[str], Optional[int], Optional[float]]:
+    """(id, nombre, cantidad, precio) para update_many; los campos vacíos no se tocan."""
+    cambio = (int(reg["id"]), _campo(reg, "nombre", str), _campo(reg, "cantidad", int), _campo(reg, "precio", float))
+    Inventario._con_cambios(Producto(cambio[0], "-", 0, 0.0), *cambio[1:])   # valida
+    return cambio
+
+def _lotes(registros: Iterable, convertir, errores: List[Tuple[int, str]]) -> Iterator[List[tuple]]:
+    """Agrupa de a LOTE los (línea, valor) que `convertir` acepta; anota los que no."""
+    lote = []
+    for linea, reg in registros:
+        try:
+            lote.append((linea, convertir(reg)))
+        except (ValueError, TypeError, KeyError) as e:
+            errores.append((linea, str(e)))
+            continue
+        if len(lote) >= LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def _aplicar(lote: List[tuple], aplicar, errores: List[Tuple[int, str]]) -> int:
+    """
+    aplicar(valores) con todo el lote en una transacción; si SQLite lo rechaza
+    (p. ej. un id repetido) se reintenta de a uno, así las filas válidas se
+    guardan igual y cada error queda con su línea.
+    """
+    try:
+        return aplicar([valor for _, valor in lote])
+    except (sqlite3.IntegrityError, ValueError) as e:
+        if len(lote) == 1:
+            errores.append((lote[0][0], str(e)))
+            return 0
+    return sum(_aplicar([item], aplicar, errores) for item in lote)
+
+def _escribir(productos: Iterable[Producto], formato: str, salida) -> int:
+    """Escribe a medida que recorre (sin armar la lista completa); devuelve cuántos."""
+    n = 0
+    if formato == "csv":
+        w = csv.writer(salida)
+        w.writerow(CAMPOS)
+        for p in productos:
+            w.writerow((p.id, p.nombre, p.cantidad, p.precio)); n += 1
+    else:
+        for p in productos:
+            salida.write(json.dumps({"id": p.id, "nombre": p.nombre, "cantidad": p.cantidad, "precio": p.precio},
+                                    ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+def _cmd_add(inv: Inventario, args) -> Tuple[int, List[Tuple[int, str]]]:
+    if args.nombre is not None:
+        p = inv.add_producto(_producto_de({"id": args.id, "nombre": args.nombre,
+                                           "cantidad": args.cantidad, "precio": args.precio}))
+        print(f"Producto añadido con ID {p.id}.")
+        return 1, []
+    errores: List[Tuple[int, str]] = []
+    total = 0
+    for lote in _lotes(_leer_registros(sys.stdin, args.formato, errores), _producto_de, errores):
+        total += _aplicar(lote, lambda productos: len(inv.add_many(productos)), errores)
+    print(f"Insertados: {total}")
+    return total, errores
+
+def _cmd_update(inv: Inventario, args) -> Tuple[int, List[Tuple[int, str]]]:
+    if args.id is not None:
+        ok = inv.actualizar_producto(args.id, args.nombre, args.cantidad, args.precio)
+        if not ok:
+            return 0, [(0, f"No existe un producto con id={args.id}.")]
+        print("Producto actualizado.")
+        return 1, []
+    errores: List[Tuple[int, str]] = []
+    total = 0
+    for lote in _lotes(_leer_registros(sys.stdin, args.formato, errores), _cambio_de, errores):
+        # un id inexistente es un error de su línea, igual que con --id
+        inv.refrescar()
+        for linea, cambio in lote:
+            if cambio[0] not in inv.productos:
+                errores.append((linea, f"No existe un producto con id={cambio[0]}."))
+        lote = [item for item in lote if item[1][0] in inv.productos]
+        if lote:
+            total += _aplicar(lote, inv.update_many, errores)
+    print(f"Actualizados: {total}")
+    return total, errores
+
+def _cmd_delete(inv: Inventario, args) -> Tuple[int, List[Tuple[int, str]]]:
+    errores: List[Tuple[int, str]] = []
+    if args.ids:
+        registros: Iterable = ((0, {"id": pid}) for pid in args.ids)
+    else:
+        # CSV/JSONL con campo id, o simplemente un id por línea
+        primera = sys.stdin.readline()
+        entrada = itertools.chain([primera], sys.stdin)
+        if primera.strip().isdigit():
+            registros = ((n, {"id": linea}) for n, linea in enumerate(entrada, 1) if linea.strip())
+        else:
+            registros = _leer_registros(entrada, args.formato, errores)
+    total = 0
+    for lote in _lotes(registros, lambda reg: int(reg["id"]), errores):
+        total += _aplicar(lote, inv.delete_many, errores)
+    print(f"Eliminados: {total}")
+    return total, errores
+
+def _cmd_import(inv: Inventario, args) -> Tuple[int, List[Tuple[int, str]]]:
+    """Alta o reemplazo: los registros con id existente se actualizan, el resto se inserta."""
+    errores: List[Tuple[int, str]] = []
+    cuenta = {"nuevos": 0, "actualizados": 0}
+
+    def reemplazar(productos: List[Producto]) -> int:
+        existentes = [p for p in productos if p.id is not None and p.id in inv.productos]
+        altas = [p for p in productos if p.id is None or p.id not in inv.productos]
+        with inv.transaction():
+            n = inv.update_many((p.id, p.nombre, p.cantidad, p.precio) for p in existentes)
+            nuevos = len(inv.add_many(altas))
+        cuenta["actualizados"] += n
+        cuenta["nuevos"] += nuevos
+        return n + nuevos
+
+    for lote in _lotes(_leer_registros(sys.stdin, args.formato, errores), _producto_de, errores):
+        _aplicar(lote, reemplazar, errores)
+    print(f"Insertados: {cuenta['nuevos']} · Actualizados: {cuenta['actualizados']}")
+    return cuenta["nuevos"] + cuenta["actualizados"], errores
+
+def _cmd_search(inv: Inventario, args) -> Tuple[int, List[Tuple[int, str]]]:
+    encontrados = inv.buscar_por_nombre(args.consulta, fuzzy=args.fuzzy, limite=args.limite,
+                                        cualquiera=args.cualquiera)
+    if args.formato == "tabla":
+        print_table(encontrados)
+    else:
+        _escribir(encontrados, args.formato, sys.stdout)
+    return len(encontrados), []
+
+def _cmd_list(inv: Inventario, args) -> Tuple[int, List[Tuple[int, str]]]:
+    productos = inv.iterar(args.offset, args.limite)
+    if args.formato == "tabla":
+        return print_paginado(productos, args.pagina), []
+    return _escribir(productos, args.formato, sys.stdout), []
+
+def _cmd_export(inv: Inventario, args) -> Tuple[int, List[Tuple[int, str]]]:
+    # en modo lazy values() lee SQLite en orden de id, sin cargar todo
+    return _escribir(inv.productos.values(), args.formato, sys.stdout), []
+
+def _entero(minimo: int):
+    """Tipo de argparse: entero >= minimo (así --pagina 0 o --offset -1 dan error de uso)."""
+    def convertir(valor: str) -> int:
+        try:
+            n = int(valor)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"{valor!r} no es un entero")
+        if n < minimo:
+            raise argparse.ArgumentTypeError(f"debe ser >= {minimo}")
+        return n
+    return convertir
+
+def _parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Inventario: menú interactivo (sin argumentos) u operaciones por lotes.")
+    ap.add_argument("--db", default="inventario.db", help="archivo SQLite (default: inventario.db)")
+    sub = ap.add_subparsers(dest="comando")
+
+    def con_formato(p: argparse.ArgumentParser, opciones=("csv", "jsonl"), default="csv") -> None:
+        p.add_argument("--formato", choices=opciones, default=default)
+
+    p = sub.add_parser("add", help="alta de un producto, o de muchos leídos de stdin")
+    p.add_argument("nombre", nargs="?")
+    p.add_argument("cantidad", nargs="?", type=int)
+    p.add_argument("precio", nargs="?", type=float)
+    p.add_argument("--id", type=int)
+    con_formato(p)
+    p.set_defaults(func=_cmd_add)
+
+    p = sub.add_parser("update", help="modifica un producto, o muchos (id + campos) leídos de stdin")
+    p.add_argument("id", nargs="?", type=int)
+    p.add_argument("--nombre")
+    p.add_argument("--cantidad", type=int)
+    p.add_argument("--precio", type=float)
+    con_formato(p)
+    p.set_defaults(func=_cmd_update)
+
+    p = sub.add_parser("delete", help="elimina los ids dados, o los leídos de stdin")
+    p.add_argument("ids", nargs="*", type=int)
+    con_formato(p)
+    p.set_defaults(func=_cmd_delete)
+
+    p = sub.add_parser("import", help="alta o reemplazo por id de los productos leídos de stdin")
+    con_formato(p)
+    p.set_defaults(func=_cmd_import)
+
+    p = sub.add_parser("export", help="escribe todos los productos en stdout")
+    con_formato(p)
+    p.set_defaults(func=_cmd_export)
+
+    p = sub.add_parser("search", help="busca por nombre")
+    p.add_argument("consulta")
+    p.add_argument("--fuzzy", action="store_true", help="tolera errores de tipeo")
+    p.add_argument("--cualquiera", action="store_true", help="alcanza con que coincida una de las palabras")
+    p.add_argument("--limite", type=_entero(1), default=50)
+    con_formato(p, ("tabla", "csv", "jsonl"), "tabla")
+    p.set_defaults(func=_cmd_search)
+
+    p = sub.add_parser("list", help="muestra los productos en orden de id, por páginas")
+    p.add_argument("--limit", "--limite", dest="limite", type=_entero(1), help="cuántos mostrar como máximo")
+    p.add_argument("--offset", type=_entero(0), default=0, help="cuántos saltear desde el principio")
+    p.add_argument("--pagina", type=_entero(1), default=FILAS_POR_PAGINA, help="filas por página (tabla)")
+    con_formato(p, ("tabla", "csv", "jsonl"), "tabla")
+    p.set_defaults(func=_cmd_list)
+    return ap
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = _parser()
+    args = ap.parse_args(argv)
+    if args.comando is None:
+        menu(args.db)
+        return 0
+    if args.comando == "add" and args.nombre is not None and (args.cantidad is None or args.precio is None):
+        ap.error("add necesita nombre, cantidad y precio (o ninguno para leer de stdin)")
+    # Por lotes no hace falta tener el catálogo en memoria: sólo ids, y la
+    # búsqueda va a productos_tokens (salvo --fuzzy, que necesita el índice en memoria)
+    try:
+        inv = Inventario(args.db, lazy=True, indice_en_memoria=getattr(args, "fuzzy", False))
+    except sqlite3.OperationalError as e:
+        print(f"No se pudo abrir {args.db}: {e}", file=sys.stderr)
+        return 1
+    try:
+        _, errores = args.func(inv, args)
+    except ValueError as e:   # validación de una operación suelta
+        errores = [(0, str(e))]
+    except sqlite3.OperationalError as e:
+        # BD bloqueada por otro proceso o de sólo lectura; los lotes anteriores ya quedaron guardados
+        errores = [(0, f"Error de la base de datos: {e}")]
+    except BrokenPipeError:
+        # la salida se cortó antes (p. ej. `| head`): no es un error
+        sys.stdout = open(os.devnull, "w")
+        return 0
+    finally:
+        inv.close()
+    errores.sort(key=lambda e: e[0])   # los de JSON y los de SQLite llegan en distinto momento
+    for linea, msg in errores[:50]:
+        print(f"línea {linea}: {msg}" if linea else msg, file=sys.stderr)
+    if len(errores) > 50:
+        print(f"... y {len(errores) - 50} errores más", file=sys.stderr)
+    return 1 if errores else 0
+
 if __name__ == "__main__":
-    menu()
+    sys.exit(main())
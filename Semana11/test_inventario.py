@@ -0,0 +1,288 @@
+# test_inventario.py
+"""Pruebas de Inventario (correr con: python -m pytest Semana11)."""
+import io
+import sqlite3
+
+import pytest
+
+import inventario
+from inventario import Inventario, Producto, main
+
+
+def _nombres(productos):
+    return [p.nombre for p in productos]
+
+
+@pytest.fixture
+def inv(tmp_path):
+    inv = Inventario(str(tmp_path / "inv.db"))
+    for nombre in ("cable usb", "cable hdmi", "mouse usb", "cable usb largo"):
+        inv.add_producto(Producto(None, nombre, 1, 1.0))
+    yield inv
+    inv.close()
+
+
+# ---------- Prefijos y errores de tipeo ----------
+def test_buscar_por_prefijo(inv):
+    assert sorted(_nombres(inv.buscar_por_nombre("cab us"))) == ["cable usb", "cable usb largo"]
+
+
+def test_buscar_fuzzy(inv):
+    assert inv.buscar_por_nombre("mouze") == []
+    assert _nombres(inv.buscar_por_nombre("mouze", fuzzy=True)) == ["mouse usb"]
+
+
+class _SinRecorrer(list):
+    def __iter__(self):
+        pytest.fail("recorrió todo el vocabulario")
+
+
+def test_buscar_por_contenido_no_recorre_el_vocabulario(inv):
+    inv._tokens_ordenados = _SinRecorrer(inv._tokens_ordenados)
+    assert _nombres(inv.buscar_por_nombre("ouse")) == ["mouse usb"]
+    assert _nombres(inv.buscar_por_nombre("dmi")) == ["cable hdmi"]
+    assert inv.buscar_por_nombre("sb") == [] and inv.buscar_por_nombre("xyz") == []
+
+
+# ---------- Ranking ----------
+def test_buscar_exige_todas_las_palabras(inv):
+    assert sorted(_nombres(inv.buscar_por_nombre("cable usb"))) == ["cable usb", "cable usb largo"]
+    assert inv.buscar_por_nombre("cable zzz") == []
+
+
+def test_buscar_cualquiera_rankea_por_cobertura(inv):
+    r = _nombres(inv.buscar_por_nombre("cable usb", cualquiera=True))
+    assert sorted(r[:2]) == ["cable usb", "cable usb largo"]
+    assert sorted(r[2:]) == ["cable hdmi", "mouse usb"]
+
+
+def test_buscar_limite(inv):
+    assert len(inv.buscar_por_nombre("cable", limite=2)) == 2
+
+
+def test_actualizar_nombre_reindexa(inv):
+    pid = inv.buscar_por_nombre("hdmi")[0].id
+    assert inv.actualizar_producto(pid, nombre="adaptador hdmi")
+    assert _nombres(inv.buscar_por_nombre("adaptador")) == ["adaptador hdmi"]
+    assert "cable hdmi" not in _nombres(inv.buscar_por_nombre("cable"))
+
+
+# ---------- Lotes y transacciones ----------
+def test_add_many_update_many_delete_many(inv):
+    nuevos = inv.add_many([Producto(None, "lapiz", 3, 0.5), Producto(None, "goma", 2, 0.3)])
+    assert [p.id for p in nuevos] == [5, 6]
+    assert inv.update_many([(5, None, 10, None), (99, "x", None, None)]) == 1
+    assert inv.productos[5].cantidad == 10
+    assert inv.delete_many([5, 6, 99]) == 2
+    assert inv.buscar_por_nombre("lapiz") == []
+
+
+def test_transaction_rollback_deja_el_cache_como_la_bd(inv):
+    with pytest.raises(RuntimeError):
+        with inv.transaction():
+            inv.add_producto(Producto(None, "lapiz", 1, 1.0))
+            inv.actualizar_producto(1, nombre="otro nombre")
+            raise RuntimeError("falla")
+    assert inv.buscar_por_nombre("lapiz") == [] and inv.buscar_por_nombre("otro") == []
+    assert inv.productos[1].nombre == "cable usb"
+    assert inv.conn.execute("SELECT count(*) FROM productos").fetchone()[0] == 4
+
+
+def test_add_many_con_id_repetido_no_guarda_ninguno(inv):
+    with pytest.raises(Exception):
+        inv.add_many([Producto(None, "nuevo", 1, 1.0), Producto(1, "repetido", 1, 1.0)])
+    assert inv.buscar_por_nombre("nuevo") == [] and len(inv.productos) == 4
+
+
+# ---------- Modo lazy ----------
+def test_lazy_mantiene_pocos_en_memoria(inv):
+    lazy = Inventario(inv.db_path, lazy=True, max_cache=2)
+    assert len(lazy.productos) == 4
+    assert [lazy.productos[pid].nombre for pid in (1, 2, 3)] == ["cable usb", "cable hdmi", "mouse usb"]
+    assert len(lazy.productos._lru) == 2
+    assert sorted(_nombres(lazy.buscar_por_nombre("usb"))) == ["cable usb", "cable usb largo", "mouse usb"]
+    assert lazy.index_nombre == {}   # no se cargó el índice: arranque sin recorrer los nombres
+    lazy.close()
+
+
+def test_lazy_con_indice_en_memoria_lo_carga_entero(inv):
+    lazy = Inventario(inv.db_path, lazy=True, max_cache=2, indice_en_memoria=True)
+    assert lazy.index_nombre == inv.index_nombre
+    assert _nombres(lazy.buscar_por_nombre("mouze", fuzzy=True)) == ["mouse usb"]
+    lazy.close()
+
+
+# ---------- Índice en SQLite ----------
+def test_indice_sigue_los_cambios_hechos_por_sql(inv):
+    inv.conn.execute("INSERT INTO productos (nombre, cantidad, precio, created_at, updated_at)"
+                     " VALUES ('teclado usb', 1, 1, '', '')")
+    inv.conn.execute("UPDATE productos SET nombre = 'mouse bluetooth' WHERE nombre = 'mouse usb'")
+    inv.conn.commit()
+    en_bd = Inventario(inv.db_path, lazy=True, indice_en_memoria=False)
+    assert sorted(_nombres(en_bd.buscar_por_nombre("usb"))) == ["cable usb", "cable usb largo", "teclado usb"]
+    assert _nombres(en_bd.buscar_por_nombre("blue")) == ["mouse bluetooth"]
+    en_bd.close()
+    assert _nombres(inv.buscar_por_nombre("blue")) == ["mouse bluetooth"]
+
+
+def test_cargar_el_indice_no_retokeniza(inv, monkeypatch):
+    monkeypatch.setattr(inventario, "tokenize_name", lambda nombre: pytest.fail("retokenizó " + nombre))
+    otro = Inventario(inv.db_path)
+    assert otro.index_nombre == inv.index_nombre
+    otro.close()
+
+
+def test_mismo_tokenizador_en_memoria_y_en_bd(inv):
+    for nombre in ("İstanbul mapa", "cafe\u0301 molido", "t-shirt_xl"):
+        inv.add_producto(Producto(None, nombre, 1, 1.0))
+    en_bd = Inventario(inv.db_path, lazy=True, indice_en_memoria=False)
+    for consulta in ("i̇stanbul", "istanbul", "cafe", "café", "xl", "shirt", "cab usb"):
+        assert _nombres(en_bd.buscar_por_nombre(consulta)) == _nombres(inv.buscar_por_nombre(consulta)), consulta
+    en_bd.close()
+
+
+# ---------- Modo compacto ----------
+def test_compacto_da_lo_mismo(inv):
+    compacto = Inventario(inv.db_path, compacto=True)
+    for consulta in ("cable", "usb", "cab usb", "hdmi"):
+        assert _nombres(compacto.buscar_por_nombre(consulta)) == _nombres(inv.buscar_por_nombre(consulta))
+    compacto.actualizar_producto(2, nombre="cable vga")
+    compacto.eliminar_producto(3)
+    assert _nombres(compacto.mostrar_todos()) == ["cable usb", "cable vga", "cable usb largo"]
+    assert compacto.buscar_por_nombre("hdmi") == []
+    compacto.close()
+
+
+# ---------- Analítica ----------
+def test_analitica(tmp_path):
+    inv = Inventario(str(tmp_path / "a.db"))
+    inv.add_many([Producto(None, "a", 1, 10.0), Producto(None, "b", 4, 5.0), Producto(None, "c", 20, 2.0)])
+    assert inv.resumen() == {"productos": 3, "unidades": 25, "valor_total": 70.0, "precio_promedio": 2.8}
+    inv.actualizar_producto(1, cantidad=3)
+    assert inv.resumen()["valor_total"] == 90.0
+    assert _nombres(inv.stock_bajo(4)) == ["a", "b"]
+    assert [(p.nombre, v) for p, v in inv.top_por_valor(2)] == [("c", 40.0), ("a", 30.0)]
+    assert [n for _, _, n in inv.histograma_precios(3)] == [1, 1, 1]
+    assert [n for _, _, n in inv.histograma_precios(1)] == [3]
+    inv.close()
+
+
+# ---------- Cambios de otros procesos ----------
+def test_refrescar_ve_lo_que_escribio_otra_conexion(inv):
+    otro = Inventario(inv.db_path)
+    otro.add_producto(Producto(None, "parlante", 2, 3.0))
+    otro.actualizar_producto(1, nombre="cable usb c")
+    otro.eliminar_producto(2)
+    otro.close()
+    assert _nombres(inv.buscar_por_nombre("parlante")) == ["parlante"]
+    assert inv.productos[1].nombre == "cable usb c"
+    assert 2 not in inv.productos and inv.resumen()["productos"] == 4
+
+
+@pytest.mark.parametrize("indice_en_memoria", [True, False])
+def test_refrescar_en_modo_lazy_no_recarga_todo(inv, monkeypatch, indice_en_memoria):
+    lazy = Inventario(inv.db_path, lazy=True, max_cache=1, indice_en_memoria=indice_en_memoria)
+    lazy.productos[1], lazy.productos[4]   # el 1 sale del LRU
+    monkeypatch.setattr(lazy, "_load_cache", lambda: pytest.fail("recargó todo"))
+    inv.add_producto(Producto(None, "parlante", 2, 3.0))
+    inv.actualizar_producto(1, nombre="cable usb c")
+    inv.eliminar_producto(2)
+    assert _nombres(lazy.buscar_por_nombre("parlante")) == ["parlante"]
+    assert sorted(_nombres(lazy.buscar_por_nombre("cable"))) == ["cable usb c", "cable usb largo"]
+    assert lazy.productos[1].nombre == "cable usb c"
+    assert 2 not in lazy.productos and lazy.resumen() == inv.resumen()
+    if indice_en_memoria:
+        assert lazy.index_nombre == inv.index_nombre
+    lazy.close()
+
+
+def test_refrescar_recarga_todo_si_se_podaron_cambios(inv, monkeypatch):
+    otro = Inventario(inv.db_path)
+    monkeypatch.setattr(Inventario, "CAMBIOS_MAX", 1)
+    for i in range(3):
+        otro.add_producto(Producto(None, f"nuevo{i}", 1, 1.0))
+    otro.close()
+    assert inv.refrescar() == -1
+    assert len(inv.buscar_por_nombre("nuevo")) == 3
+
+
+# ---------- Interfaz por lotes ----------
+def _correr(monkeypatch, db, entrada, *args):
+    monkeypatch.setattr("sys.stdin", io.StringIO(entrada))
+    return main(["--db", db, *args])
+
+
+def test_cli_add_search_y_export(tmp_path, monkeypatch, capsys):
+    db = str(tmp_path / "cli.db")
+    entrada = "nombre,cantidad,precio\ncable usb,1,1.5\nmouse,2,3\n"
+    assert _correr(monkeypatch, db, entrada, "add") == 0
+    assert "Insertados: 2" in capsys.readouterr().out
+    assert _correr(monkeypatch, db, "", "search", "usb", "--formato", "jsonl") == 0
+    assert '"nombre": "cable usb"' in capsys.readouterr().out
+    assert _correr(monkeypatch, db, "", "export") == 0
+    assert capsys.readouterr().out.splitlines() == ["id,nombre,cantidad,precio", "1,cable usb,1,1.5", "2,mouse,2,3.0"]
+
+
+def test_cli_jsonl_sigue_despues_de_una_linea_invalida(tmp_path, monkeypatch, capsys):
+    db = str(tmp_path / "cli.db")
+    entrada = ('{"nombre": "a", "cantidad": 1, "precio": 1}\n{mal\n[1]\n'
+               '{"nombre": "b", "cantidad": 1, "precio": 1}\n')
+    assert _correr(monkeypatch, db, entrada, "add", "--formato", "jsonl") == 1
+    err = capsys.readouterr().err
+    assert "línea 2: JSON inválido" in err and "línea 3:" in err
+    inv = Inventario(db)
+    assert sorted(p.nombre for p in inv.mostrar_todos()) == ["a", "b"]
+    inv.close()
+
+
+def test_cli_id_repetido_no_pierde_el_lote(tmp_path, monkeypatch, capsys):
+    db = str(tmp_path / "cli.db")
+    entrada = "id,nombre,cantidad,precio\n5,x,1,1\n5,y,1,1\n6,z,1,1\n"
+    assert _correr(monkeypatch, db, entrada, "add") == 1
+    assert "línea 3: UNIQUE" in capsys.readouterr().err
+    inv = Inventario(db)
+    assert [(p.id, p.nombre) for p in inv.mostrar_todos()] == [(5, "x"), (6, "z")]
+    inv.close()
+
+
+def test_cli_update_informa_ids_inexistentes(tmp_path, monkeypatch, capsys):
+    db = str(tmp_path / "cli.db")
+    _correr(monkeypatch, db, "id,nombre,cantidad,precio\n1,a,1,1\n", "add")
+    assert _correr(monkeypatch, db, "id,cantidad\n1,5\n99,2\n", "update") == 1
+    salida = capsys.readouterr()
+    assert "Actualizados: 1" in salida.out
+    assert "línea 3: No existe un producto con id=99." in salida.err
+    inv = Inventario(db)
+    assert inv.productos[1].cantidad == 5
+    inv.close()
+
+
+def test_cli_bd_bloqueada_sale_con_error(tmp_path, monkeypatch, capsys):
+    def bloqueada(self, productos):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(Inventario, "add_many", bloqueada)
+    assert _correr(monkeypatch, str(tmp_path / "cli.db"), "nombre,cantidad,precio\na,1,1\n", "add") == 1
+    assert "database is locked" in capsys.readouterr().err
+
+
+# ---------- Listado paginado ----------
+def test_iterar_offset_y_limite(inv):
+    assert [p.id for p in inv.iterar(1, 2)] == [2, 3]
+    with pytest.raises(ValueError):
+        list(inv.iterar(-1))
+
+
+@pytest.mark.parametrize("opcion", [["--pagina", "0"], ["--limit", "-1"], ["--offset", "-1"]])
+def test_cli_list_rechaza_valores_fuera_de_rango(tmp_path, monkeypatch, opcion):
+    with pytest.raises(SystemExit) as e:
+        _correr(monkeypatch, str(tmp_path / "cli.db"), "", "list", *opcion)
+    assert e.value.code == 2
+
+
+def test_cli_list_pagina(tmp_path, monkeypatch, capsys):
+    db = str(tmp_path / "cli.db")
+    _correr(monkeypatch, db, "id,nombre,cantidad,precio\n1,a,1,1\n2,b,1,1\n3,c,1,1\n", "add")
+    capsys.readouterr()
+    assert _correr(monkeypatch, db, "", "list", "--pagina", "1", "--offset", "1") == 0
+    salida = capsys.readouterr().out
+    assert salida.count("NOMBRE") == 2 and " a " not in salida
@@ -1,15 +1,30 @@
-from flask import Flask, jsonify, request, render_template, redirect, url_for, flash
+import csv
+import hashlib
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Flask, Response, jsonify, request, render_template, redirect, url_for, flash, stream_with_context
 from mysql.connector import Error
-from conexion import get_connection
-from flask_login import LoginManager, login_required
-from models import User, get_user_public_by_id
+import conexion
+from conexion import get_db, pool_stats
+from functools import wraps
+from flask_login import LoginManager, current_user, login_required
+from models import User, get_user_public_by_id, user_cache_stats
 from auth import auth_bp
+from cache import VersionedCache
+import esquema
+import hashing
+import instrumentacion
+import limitador
 
 # -----------------------------------------------------
 # App y Login Manager
 # -----------------------------------------------------
 app = Flask(__name__, static_folder="static", template_folder="templates")
-app.config.update(SECRET_KEY="cambia-esta-clave")
+# en producción SECRET_KEY viene de .env (ver wsgi.create_app)
+app.config.update(SECRET_KEY=os.getenv("SECRET_KEY", "cambia-esta-clave"))
 
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
@@ -20,9 +35,23 @@ def load_user(user_id):
     row = get_user_public_by_id(user_id)
     return User.from_row(row) if row else None
 
+@login_manager.unauthorized_handler
+def unauthorized():
+    # la API responde JSON; las páginas redirigen al login como siempre
+    if request.path.startswith("/api/"):
+        return jsonify({"ok": False, "error": "No autenticado."}), 401
+    flash("Inicia sesión para continuar.", "info")
+    return redirect(url_for(login_manager.login_view, next=request.full_path.rstrip("?")))
+
 # Blueprint de auth
 app.register_blueprint(auth_bp, url_prefix="/auth")
 
+# Una conexión por request (get_db), devuelta al pool en teardown_appcontext
+conexion.init_app(app)
+
+# Server-Timing + log de consultas lentas (SQL_SLOW_MS / SQL_SLOW_LOG)
+instrumentacion.init_app(app)
+
 # -----------------------------------------------------
 # Helpers de mapeo / existencia de tablas
 # -----------------------------------------------------
@@ -33,26 +62,18 @@ def _pick(cols: set, candidates: list[str]):
     return None
 
 def _table_exists(conn, table: str) -> bool:
-    cur = None
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT COUNT(*) FROM information_schema.tables "
-            "WHERE table_schema = DATABASE() AND table_name = %s",
-            (table,)
-        )
-        return cur.fetchone()[0] == 1
-    finally:
-        if cur: cur.close()
+    return esquema.tabla_existe(conn, table)
 
 def _cols_for_table(conn, table: str) -> set:
-    cur = None
-    try:
-        cur = conn.cursor(dictionary=True)
-        cur.execute(f"SHOW COLUMNS FROM {table}")
-        return {row["Field"] for row in cur.fetchall()}
-    finally:
-        if cur: cur.close()
+    return esquema.columnas(conn, table)
+
+# ---- Listas de referencia (selects de categorías / proyectos) ----
+# Se invalidan en los handlers que crean/editan/borran categorías o proyectos;
+# REF_CACHE_TTL acota lo desactualizado si otro worker o un script las cambia.
+_ref_cache = VersionedCache(ttl=float(os.getenv("REF_CACHE_TTL", "300")))
+
+def _invalidar_referencia(tabla=None):
+    _ref_cache.invalidate(tabla)
 
 # ---- Mapas (categorias / productos) ----
 def map_categorias(conn):
@@ -71,6 +92,7 @@ def map_productos(conn):
         "nombre": _pick(cols, ["nombre", "name", "titulo"]),
         "precio": _pick(cols, ["precio", "price", "monto", "costo"]),
         "stock": _pick(cols, ["stock", "existencias", "cantidad"]),
+        "descripcion": _pick(cols, ["descripcion", "description", "detalle"]),
         # FK opcional a categorías si tu tabla la tuviera en el futuro
         "cat_fk": _pick(cols, ["categoria_id", "id_categoria", "category_id", "categoria", "categoriaId"]),
         "all": cols
@@ -93,12 +115,158 @@ def map_tareas(conn):
         "id": _pick(cols, ["id", "id_tarea", "tarea_id", "idTarea"]),
         "proy_fk": _pick(cols, ["id_proyecto", "proyecto_id", "idProyecto"]),
         "titulo": _pick(cols, ["titulo", "title", "nombre"]),
+        "descripcion": _pick(cols, ["descripcion", "description", "detalle"]),
         "estado": _pick(cols, ["estado", "status"]),
         "asignado": _pick(cols, ["asignado_a", "asignado", "responsable"]),
         "creado": _pick(cols, ["creado_en", "created_at", "created"]),
         "all": cols
     }
 
+# -----------------------------------------------------
+# Paginación por cursor (keyset): ?after=<id> / ?before=<id> / ?limit=
+# -----------------------------------------------------
+PAGE_SIZE = 50
+PAGE_MAX = 500
+
+def _page_args():
+    after = request.args.get("after", type=int)
+    before = request.args.get("before", type=int) if after is None else None
+    limit = request.args.get("limit", type=int) or PAGE_SIZE
+    return {"after": after, "before": before, "limit": max(1, min(limit, PAGE_MAX))}
+
+def _keyset(pg, id_col, desc=True, sort_col=None, sort_val=None):
+    """
+    Devuelve (where, params, order) para leer la página a partir del cursor.
+    Con `sort_col` se pagina por (sort_col, id) y `sort_val` es el valor de
+    sort_col en la fila cursor. Hacia atrás (?before=) se recorre en sentido
+    inverso y _page_rows devuelve el orden normal.
+    """
+    forward = pg["before"] is None
+    cursor = pg["after"] if forward else pg["before"]
+    scan_desc = desc if forward else not desc
+    op = "<" if scan_desc else ">"
+    direction = "DESC" if scan_desc else "ASC"
+    order = f"{sort_col} {direction}, {id_col} {direction}" if sort_col else f"{id_col} {direction}"
+    if cursor is None:
+        return None, [], order
+    if sort_col:
+        return (f"({sort_col} {op} %s OR ({sort_col} = %s AND {id_col} {op} %s))",
+                [sort_val, sort_val, cursor], order)
+    return f"{id_col} {op} %s", [cursor], order
+
+def _page_rows(rows, pg, sin_args=()):
+    """
+    Recorta la fila extra (se piden limit+1) y arma los cursores next/prev.
+    `sin_args`: parámetros que no pasan a los links (p. ej. filtros que no se aplicaron).
+    """
+    has_more = len(rows) > pg["limit"]
+    rows = rows[:pg["limit"]]
+    if pg["before"] is not None:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, pg["after"] is not None
+    page = {
+        "limit": pg["limit"],
+        "next": rows[-1]["id"] if rows and has_next else None,
+        "prev": rows[0]["id"] if rows and has_prev else None,
+        # resto de la query string (filtros) para los links de la plantilla
+        "args": {k: v for k, v in request.args.items() if k not in ("after", "before", *sin_args)},
+    }
+    return rows, page
+
+# -----------------------------------------------------
+# Filtros de listas: {parámetro: (condición con %s, conversión)}
+# -----------------------------------------------------
+# Los LIKE llevan ESCAPE '!': el texto del usuario no puede meter comodines, y
+# la barra invertida (el escape por defecto de MySQL) queda como un carácter más.
+def _escapar_like(v):
+    return v.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+def _prefijo(v):
+    """'cab' -> 'cab%': un LIKE por prefijo sí usa el índice de la columna."""
+    return _escapar_like(v) + "%"
+
+def _contiene(v):
+    return f"%{_escapar_like(v)}%"
+
+def _apply_filtros(filtros, args):
+    """
+    Traduce los parámetros presentes en `args` a condiciones WHERE.
+    Lanza ValueError con el nombre del parámetro si no se puede convertir.
+    """
+    where, params = [], []
+    for nombre, (cond, conv) in filtros.items():
+        raw = (args.get(nombre) or "").strip()
+        if not raw:
+            continue
+        try:
+            params.append(conv(raw))
+        except ValueError:
+            raise ValueError(nombre)
+        where.append(cond)
+    return where, params
+
+# -----------------------------------------------------
+# Exportación en streaming (CSV / JSON)
+# -----------------------------------------------------
+EXPORT_CHUNK = 500
+EXPORT_FORMATS = {"csv": "text/csv", "json": "application/json"}
+
+def _json_default(o):
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    return str(o)
+
+def _stream_export(conn, sql, columnas, formato, nombre):
+    """
+    Devuelve una respuesta que escribe el resultado de `sql` por trozos.
+    El cursor de mysql.connector no es bufferizado: fetchmany() va leyendo
+    del servidor, así que la memoria no crece con el número de filas.
+    stream_with_context mantiene vivo el contexto, así que la conexión del
+    request (get_db) se devuelve al pool recién cuando termina (o se corta) la descarga.
+    """
+    def generar():
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql)
+            if formato == "csv":
+                buf = io.StringIO()
+                w = csv.writer(buf)
+                w.writerow(columnas)
+                while True:
+                    rows = cur.fetchmany(EXPORT_CHUNK)
+                    if not rows:
+                        break
+                    for r in rows:
+                        w.writerow([r[c] for c in columnas])
+                    yield buf.getvalue()
+                    buf.seek(0); buf.truncate(0)
+                if buf.tell():
+                    yield buf.getvalue()
+            else:
+                yield "["
+                sep = ""
+                while True:
+                    rows = cur.fetchmany(EXPORT_CHUNK)
+                    if not rows:
+                        break
+                    chunk = ",".join(
+                        json.dumps({c: r[c] for c in columnas}, default=_json_default, ensure_ascii=False)
+                        for r in rows
+                    )
+                    yield sep + chunk
+                    sep = ","
+                yield "]"
+        finally:
+            cur.close()
+
+    resp = Response(stream_with_context(generar()), mimetype=EXPORT_FORMATS[formato])
+    resp.headers["Content-Disposition"] = f'attachment; filename="{nombre}.{formato}"'
+    return resp
+
 # -----------------------------------------------------
 # HOME + SALUD
 # -----------------------------------------------------
@@ -109,22 +277,49 @@ def home():
 @app.route("/test_db")
 def test_db():
     try:
-        conn = get_connection()
+        conn = get_db()
         cur = conn.cursor()
         cur.execute("SELECT 1")
         cur.fetchone()
-        cur.close(); conn.close()
+        cur.close()
         return jsonify({"ok": True, "msg": "Conexión a MySQL OK"})
     except Error as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
+@app.route("/stats")
+@login_required
+def stats():
+    return jsonify({"ok": True, "pool": pool_stats(), "esquema": esquema.stats(),
+                    "usuarios": user_cache_stats(), "referencias": _ref_cache.stats(),
+                    "sql": instrumentacion.stats(), "hash": hashing.stats(),
+                    "login": limitador.stats()})
+
+# usuarios (separados por coma) que pueden usar las rutas /admin
+ADMIN_USERS = {u.strip().lower() for u in os.getenv("ADMIN_USERS", "").split(",") if u.strip()}
+
+def admin_required(vista):
+    @wraps(vista)
+    @login_required
+    def envuelta(*args, **kwargs):
+        if (getattr(current_user, "username", None) or "").lower() not in ADMIN_USERS:
+            return jsonify({"ok": False, "error": "Sólo para administradores"}), 403
+        return vista(*args, **kwargs)
+    return envuelta
+
+@app.route("/admin/esquema/refrescar", methods=["POST"])
+@admin_required
+def refrescar_esquema():
+    esquema.invalidar()
+    _invalidar_referencia()
+    return jsonify({"ok": True, "msg": "Cache de esquema invalidada"})
+
 # =====================================================
 # ============= CATEGORIAS (CRUD COMPLETO) ============
 # =====================================================
 @app.route("/categorias")
 @login_required
 def listar_categorias():
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         if not _table_exists(conn, "categorias"):
@@ -135,23 +330,36 @@ def listar_categorias():
             flash("La tabla 'categorias' no tiene columnas compatibles.", "danger")
             return render_template("categorias/list.html", categorias=[])
         cur = conn.cursor(dictionary=True)
+        pg = _page_args()
+        cursor_id = pg["after"] if pg["after"] is not None else pg["before"]
+        sort_val = None
+        if cursor_id is not None:
+            # el orden es por nombre: necesitamos el nombre de la fila cursor
+            cur.execute(f"SELECT {m['nombre']} AS nombre FROM categorias WHERE {m['id']}=%s", (cursor_id,))
+            row = cur.fetchone()
+            if row is None:
+                pg["after"] = pg["before"] = None
+            else:
+                sort_val = row["nombre"]
+        where, params, order = _keyset(pg, m["id"], desc=False, sort_col=m["nombre"], sort_val=sort_val)
         desc_sql = f", {m['descripcion']} AS descripcion" if m["descripcion"] else ", NULL AS descripcion"
         cur.execute(f"""
             SELECT {m['id']} AS id, {m['nombre']} AS nombre{desc_sql}
             FROM categorias
-            ORDER BY {m['nombre']}
-        """)
-        categorias = cur.fetchall()
-        return render_template("categorias/list.html", categorias=categorias)
+            {f"WHERE {where}" if where else ""}
+            ORDER BY {order}
+            LIMIT {pg['limit'] + 1}
+        """, tuple(params))
+        categorias, page = _page_rows(cur.fetchall(), pg)
+        return render_template("categorias/list.html", categorias=categorias, page=page)
     finally:
         if cur: cur.close()
-        conn.close()
 
 @app.route("/categorias/crear", methods=["GET","POST"])
 @login_required
 def crear_categoria():
     if request.method == "POST":
-        conn = get_connection()
+        conn = get_db()
         cur = None
         try:
             if not _table_exists(conn, "categorias"):
@@ -172,6 +380,7 @@ def crear_categoria():
             else:
                 cur.execute(f"INSERT INTO categorias ({m['nombre']}) VALUES (%s)", (nombre,))
             conn.commit()
+            _invalidar_referencia("categorias")
             flash("Categoría creada.", "success")
             return redirect(url_for("listar_categorias"))
         except Exception:
@@ -180,13 +389,12 @@ def crear_categoria():
             return render_template("categorias/form.html", categoria=None)
         finally:
             if cur: cur.close()
-            conn.close()
     return render_template("categorias/form.html", categoria=None)
 
 @app.route("/categorias/editar/<int:cat_id>", methods=["GET","POST"])
 @login_required
 def editar_categoria(cat_id):
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         if not _table_exists(conn, "categorias"):
@@ -212,6 +420,7 @@ def editar_categoria(cat_id):
                             (nombre, cat_id)
                         )
                     conn.commit()
+                    _invalidar_referencia("categorias")
                     flash("Categoría actualizada.", "success")
                     return redirect(url_for("listar_categorias"))
                 except Exception:
@@ -230,13 +439,12 @@ def editar_categoria(cat_id):
         return render_template("categorias/form.html", categoria=categoria)
     finally:
         if cur: cur.close()
-        conn.close()
 
 @app.route("/categorias/eliminar/<int:cat_id>", methods=["GET","POST"])
 @login_required
 def eliminar_categoria(cat_id):
     if request.method == "POST":
-        conn = get_connection()
+        conn = get_db()
         cur = None
         try:
             if not _table_exists(conn, "categorias"):
@@ -246,6 +454,7 @@ def eliminar_categoria(cat_id):
             cur = conn.cursor()
             cur.execute(f"DELETE FROM categorias WHERE {m['id']}=%s", (cat_id,))
             conn.commit()
+            _invalidar_referencia("categorias")
             flash("Categoría eliminada.", "info")
             return redirect(url_for("listar_categorias"))
         except Exception:
@@ -254,9 +463,8 @@ def eliminar_categoria(cat_id):
             return redirect(url_for("listar_categorias"))
         finally:
             if cur: cur.close()
-            conn.close()
 
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         if not _table_exists(conn, "categorias"):
@@ -274,7 +482,6 @@ def eliminar_categoria(cat_id):
         return render_template("categorias/confirm_delete.html", categoria=categoria)
     finally:
         if cur: cur.close()
-        conn.close()
 
 # =====================================================
 # ===============   PROYECTOS (CRUD)   ================
@@ -282,7 +489,7 @@ def eliminar_categoria(cat_id):
 @app.route("/proyectos")
 @login_required
 def listar_proyectos():
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         if not _table_exists(conn, "proyectos"):
@@ -293,12 +500,18 @@ def listar_proyectos():
         parts = [f"{mp['id']} AS id", f"{mp['nombre']} AS nombre"]
         parts.append(f"{mp['descripcion']} AS descripcion" if mp["descripcion"] else "NULL AS descripcion")
         parts.append(f"{mp['creado']} AS creado_en" if mp["creado"] else "NULL AS creado_en")
-        cur.execute(f"SELECT {', '.join(parts)} FROM proyectos ORDER BY {mp['id']} DESC")
-        proyectos = cur.fetchall()
-        return render_template("proyectos/list.html", proyectos=proyectos)
+        pg = _page_args()
+        where, params, order = _keyset(pg, mp["id"])
+        cur.execute(
+            f"SELECT {', '.join(parts)} FROM proyectos"
+            + (f" WHERE {where}" if where else "")
+            + f" ORDER BY {order} LIMIT {pg['limit'] + 1}",
+            tuple(params)
+        )
+        proyectos, page = _page_rows(cur.fetchall(), pg)
+        return render_template("proyectos/list.html", proyectos=proyectos, page=page)
     finally:
         if cur: cur.close()
-        conn.close()
 
 @app.route("/proyectos/crear", methods=["GET", "POST"])
 @login_required
@@ -309,7 +522,7 @@ def crear_proyecto():
         if not nombre:
             flash("El nombre es obligatorio.", "warning")
             return render_template("proyectos/form.html", proyecto=None)
-        conn = get_connection()
+        conn = get_db()
         cur = None
         try:
             mp = map_proyectos(conn)
@@ -320,6 +533,7 @@ def crear_proyecto():
             placeholders = ",".join(["%s"] * len(vals))
             cur.execute(f"INSERT INTO proyectos ({', '.join(cols)}) VALUES ({placeholders})", tuple(vals))
             conn.commit()
+            _invalidar_referencia("proyectos")
             flash("Proyecto creado.", "success")
             return redirect(url_for("listar_proyectos"))
         except Exception:
@@ -328,13 +542,12 @@ def crear_proyecto():
             return render_template("proyectos/form.html", proyecto=None)
         finally:
             if cur: cur.close()
-            conn.close()
     return render_template("proyectos/form.html", proyecto=None)
 
 @app.route("/proyectos/editar/<int:proy_id>", methods=["GET", "POST"])
 @login_required
 def editar_proyecto(proy_id):
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         mp = map_proyectos(conn)
@@ -352,6 +565,7 @@ def editar_proyecto(proy_id):
                 try:
                     cur.execute(f"UPDATE proyectos SET {', '.join(sets)} WHERE {mp['id']}=%s", tuple(vals))
                     conn.commit()
+                    _invalidar_referencia("proyectos")
                     flash("Proyecto actualizado.", "success")
                     return redirect(url_for("listar_proyectos"))
                 except Exception:
@@ -368,19 +582,19 @@ def editar_proyecto(proy_id):
         return render_template("proyectos/form.html", proyecto=proyecto)
     finally:
         if cur: cur.close()
-        conn.close()
 
 @app.route("/proyectos/eliminar/<int:proy_id>", methods=["GET", "POST"])
 @login_required
 def eliminar_proyecto(proy_id):
     if request.method == "POST":
-        conn = get_connection()
+        conn = get_db()
         cur = None
         try:
             mp = map_proyectos(conn)
             cur = conn.cursor()
             cur.execute(f"DELETE FROM proyectos WHERE {mp['id']}=%s", (proy_id,))
             conn.commit()
+            _invalidar_referencia("proyectos")
             flash("Proyecto eliminado.", "info")
             return redirect(url_for("listar_proyectos"))
         except Exception:
@@ -389,9 +603,8 @@ def eliminar_proyecto(proy_id):
             return redirect(url_for("listar_proyectos"))
         finally:
             if cur: cur.close()
-            conn.close()
 
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         mp = map_proyectos(conn)
@@ -401,12 +614,14 @@ def eliminar_proyecto(proy_id):
         return render_template("proyectos/confirm_delete.html", proyecto=proyecto)
     finally:
         if cur: cur.close()
-        conn.close()
 
 # =====================================================
 # ==================  TAREAS (CRUD)  ==================
 # =====================================================
 def _fetch_proyectos(conn):
+    return _ref_cache.get_or_load("proyectos", lambda: _load_proyectos(conn))
+
+def _load_proyectos(conn):
     if not _table_exists(conn, "proyectos"):
         return []
     mp = map_proyectos(conn)
@@ -416,54 +631,79 @@ def _fetch_proyectos(conn):
     cur.close()
     return rows
 
+def _tareas_select(conn, mt, extra=""):
+    """
+    SELECT ... FROM de tareas (con JOIN a proyectos si se puede), sin WHERE/ORDER.
+    `extra` son columnas adicionales (terminadas en coma) al inicio del SELECT.
+    """
+    can_join = _table_exists(conn, "proyectos")
+    mp = map_proyectos(conn) if can_join else None
+    if can_join and mp["id"] and mp["nombre"]:
+        return f"""
+            SELECT {extra}
+                t.{mt['id']}       AS id,
+                t.{mt['titulo']}   AS titulo,
+                t.{mt['estado']}   AS estado,
+                t.{mt['asignado']} AS asignado_a,
+                {f"t.{mt['creado']} AS creado_en," if mt['creado'] else "NULL AS creado_en,"}
+                p.{mp['nombre']}   AS proyecto
+            FROM tareas t
+            LEFT JOIN proyectos p ON p.{mp['id']} = t.{mt['proy_fk']}
+        """
+    return f"""
+        SELECT {extra}
+            t.{mt['id']}       AS id,
+            t.{mt['titulo']}   AS titulo,
+            t.{mt['estado']}   AS estado,
+            t.{mt['asignado']} AS asignado_a,
+            {f"t.{mt['creado']} AS creado_en" if mt['creado'] else "NULL AS creado_en"},
+            NULL AS proyecto
+        FROM tareas t
+    """
+
 @app.route("/tareas")
 @login_required
 def listar_tareas():
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         if not _table_exists(conn, "tareas"):
             flash("La tabla 'tareas' no existe.", "danger")
             return render_template("tareas/list.html", tareas=[])
         mt = map_tareas(conn)
-        can_join = _table_exists(conn, "proyectos")
-        mp = map_proyectos(conn) if can_join else None
         cur = conn.cursor(dictionary=True)
-        if can_join and mp["id"] and mp["nombre"]:
-            cur.execute(f"""
-                SELECT
-                    t.{mt['id']}       AS id,
-                    t.{mt['titulo']}   AS titulo,
-                    t.{mt['estado']}   AS estado,
-                    t.{mt['asignado']} AS asignado_a,
-                    {f"t.{mt['creado']} AS creado_en," if mt['creado'] else "NULL AS creado_en,"}
-                    p.{mp['nombre']}   AS proyecto
-                FROM tareas t
-                LEFT JOIN proyectos p ON p.{mp['id']} = t.{mt['proy_fk']}
-                ORDER BY t.{mt['id']} DESC
-            """)
-        else:
-            cur.execute(f"""
-                SELECT
-                    t.{mt['id']}       AS id,
-                    t.{mt['titulo']}   AS titulo,
-                    t.{mt['estado']}   AS estado,
-                    t.{mt['asignado']} AS asignado_a,
-                    {f"t.{mt['creado']} AS creado_en" if mt['creado'] else "NULL AS creado_en"},
-                    NULL AS proyecto
-                FROM tareas t
-                ORDER BY t.{mt['id']} DESC
-            """)
-        tareas = cur.fetchall()
-        return render_template("tareas/list.html", tareas=tareas)
+        pg = _page_args()
+        where, params, order = _keyset(pg, f"t.{mt['id']}")
+        cur.execute(f"""
+            {_tareas_select(conn, mt)}
+            {f"WHERE {where}" if where else ""}
+            ORDER BY {order}
+            LIMIT {pg['limit'] + 1}
+        """, tuple(params))
+        tareas, page = _page_rows(cur.fetchall(), pg)
+        return render_template("tareas/list.html", tareas=tareas, page=page)
     finally:
         if cur: cur.close()
-        conn.close()
+
+@app.route("/tareas/exportar")
+@login_required
+def exportar_tareas():
+    formato = (request.args.get("formato") or "csv").lower()
+    if formato not in EXPORT_FORMATS:
+        flash("Formato de exportación no soportado (use csv o json).", "warning")
+        return redirect(url_for("listar_tareas"))
+    conn = get_db()
+    if not _table_exists(conn, "tareas"):
+        flash("La tabla 'tareas' no existe.", "danger")
+        return redirect(url_for("listar_tareas"))
+    mt = map_tareas(conn)
+    sql = f"{_tareas_select(conn, mt)} ORDER BY t.{mt['id']}"
+    return _stream_export(conn, sql, ["id", "proyecto", "titulo", "estado", "asignado_a", "creado_en"], formato, "tareas")
 
 @app.route("/tareas/crear", methods=["GET", "POST"])
 @login_required
 def crear_tarea():
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         mt = map_tareas(conn)
@@ -496,12 +736,11 @@ def crear_tarea():
         return render_template("tareas/form.html", tarea=None, proyectos=proyectos)
     finally:
         if cur: cur.close()
-        conn.close()
 
 @app.route("/tareas/editar/<int:tarea_id>", methods=["GET", "POST"])
 @login_required
 def editar_tarea(tarea_id):
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         mt = map_tareas(conn)
@@ -546,13 +785,12 @@ def editar_tarea(tarea_id):
         return render_template("tareas/form.html", tarea=tarea, proyectos=proyectos)
     finally:
         if cur: cur.close()
-        conn.close()
 
 @app.route("/tareas/eliminar/<int:tarea_id>", methods=["GET", "POST"])
 @login_required
 def eliminar_tarea(tarea_id):
     if request.method == "POST":
-        conn = get_connection()
+        conn = get_db()
         cur = None
         try:
             mt = map_tareas(conn)
@@ -567,8 +805,7 @@ def eliminar_tarea(tarea_id):
             return redirect(url_for("listar_tareas"))
         finally:
             if cur: cur.close()
-            conn.close()
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         mt = map_tareas(conn)
@@ -578,12 +815,14 @@ def eliminar_tarea(tarea_id):
         return render_template("tareas/confirm_delete.html", tarea=tarea)
     finally:
         if cur: cur.close()
-        conn.close()
 
 # =====================================================
 # ==============  PRODUCTOS (CRUD)  ===================
 # =====================================================
 def _fetch_categorias(conn):
+    return _ref_cache.get_or_load("categorias", lambda: _load_categorias(conn))
+
+def _load_categorias(conn):
     if not _table_exists(conn, "categorias"):
         return []
     m = map_categorias(conn)
@@ -593,52 +832,260 @@ def _fetch_categorias(conn):
     cur.close()
     return rows
 
+def _productos_select(conn, mp, extra=""):
+    """
+    SELECT ... FROM de productos (con JOIN a categorías si se puede), sin WHERE/ORDER.
+    `extra` son columnas adicionales (terminadas en coma) al inicio del SELECT.
+    """
+    can_join = mp["cat_fk"] and _table_exists(conn, "categorias")
+    mc = map_categorias(conn) if can_join else None
+    if can_join and mc["id"] and mc["nombre"]:
+        return f"""
+            SELECT {extra}
+                p.{mp['id']}     AS id,
+                p.{mp['nombre']} AS nombre,
+                {f"p.{mp['precio']} AS precio" if mp['precio'] else "NULL AS precio"},
+                {f"p.{mp['stock']}  AS stock"  if mp['stock']  else "NULL AS stock"},
+                c.{mc['nombre']} AS categoria
+            FROM productos p
+            LEFT JOIN categorias c ON c.{mc['id']} = p.{mp['cat_fk']}
+        """
+    return f"""
+        SELECT {extra}
+            p.{mp['id']}     AS id,
+            p.{mp['nombre']} AS nombre,
+            {f"p.{mp['precio']} AS precio" if mp['precio'] else "NULL AS precio"},
+            {f"p.{mp['stock']}  AS stock"  if mp['stock']  else "NULL AS stock"},
+            NULL AS categoria
+        FROM productos p
+    """
+
+def _productos_filtros(mp):
+    """
+    Filtros de la lista de productos: {parámetro: (condición SQL, conversión)}.
+    Sólo se ofrecen los que tienen columna detectada; schema.sql indexa
+    categoria_id, precio, stock y nombre para que no recorran la tabla.
+    """
+    filtros = {"q": (f"p.{mp['nombre']} LIKE %s ESCAPE '!'", _prefijo)}
+    if mp["cat_fk"]:
+        filtros["categoria_id"] = (f"p.{mp['cat_fk']} = %s", int)
+    if mp["precio"]:
+        filtros["precio_min"] = (f"p.{mp['precio']} >= %s", float)
+        filtros["precio_max"] = (f"p.{mp['precio']} <= %s", float)
+    if mp["stock"]:
+        filtros["stock_max"] = (f"p.{mp['stock']} <= %s", int)
+    return filtros
+
 @app.route("/productos")
 @login_required
 def listar_productos():
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         if not _table_exists(conn, "productos"):
             flash("La tabla 'productos' no existe.", "warning")
-            return render_template("productos/list.html", productos=[])
+            return render_template("productos/list.html", productos=[], filtros=request.args)
         mp = map_productos(conn)
-        can_join = mp["cat_fk"] and _table_exists(conn, "categorias")
-        mc = map_categorias(conn) if can_join else None
+        categorias = _fetch_categorias(conn) if mp["cat_fk"] else []
+        filtros = _productos_filtros(mp)
+        ignorados = ()
+        try:
+            where, params = _apply_filtros(filtros, request.args)
+        except ValueError as e:
+            flash(f"Filtro inválido: {e}.", "warning")
+            # no se aplicó ningún filtro: tampoco van a los links de otras páginas
+            where, params, ignorados = [], [], tuple(filtros)
+        pg = _page_args()
+        ks_where, ks_params, order = _keyset(pg, f"p.{mp['id']}")
+        if ks_where:
+            where.append(ks_where); params += ks_params
         cur = conn.cursor(dictionary=True)
-        if can_join and mc["id"] and mc["nombre"]:
-            cur.execute(f"""
-                SELECT
-                    p.{mp['id']}     AS id,
-                    p.{mp['nombre']} AS nombre,
-                    {f"p.{mp['precio']} AS precio" if mp['precio'] else "NULL AS precio"},
-                    {f"p.{mp['stock']}  AS stock"  if mp['stock']  else "NULL AS stock"},
-                    c.{mc['nombre']} AS categoria
-                FROM productos p
-                LEFT JOIN categorias c ON c.{mc['id']} = p.{mp['cat_fk']}
-                ORDER BY p.{mp['id']} DESC
-            """)
-        else:
-            cur.execute(f"""
-                SELECT
-                    p.{mp['id']}     AS id,
-                    p.{mp['nombre']} AS nombre,
-                    {f"p.{mp['precio']} AS precio" if mp['precio'] else "NULL AS precio"},
-                    {f"p.{mp['stock']}  AS stock"  if mp['stock']  else "NULL AS stock"},
-                    NULL AS categoria
-                FROM productos p
-                ORDER BY p.{mp['id']} DESC
-            """)
-        productos = cur.fetchall()
-        return render_template("productos/list.html", productos=productos)
+        cur.execute(f"""
+            {_productos_select(conn, mp)}
+            {f"WHERE {' AND '.join(where)}" if where else ""}
+            ORDER BY {order}
+            LIMIT {pg['limit'] + 1}
+        """, tuple(params))
+        productos, page = _page_rows(cur.fetchall(), pg, ignorados)
+        return render_template("productos/list.html", productos=productos, page=page,
+                               categorias=categorias, cat_fk=mp["cat_fk"], filtros=request.args)
+    finally:
+        if cur: cur.close()
+
+@app.route("/productos/exportar")
+@login_required
+def exportar_productos():
+    formato = (request.args.get("formato") or "csv").lower()
+    if formato not in EXPORT_FORMATS:
+        flash("Formato de exportación no soportado (use csv o json).", "warning")
+        return redirect(url_for("listar_productos"))
+    conn = get_db()
+    if not _table_exists(conn, "productos"):
+        flash("La tabla 'productos' no existe.", "warning")
+        return redirect(url_for("listar_productos"))
+    mp = map_productos(conn)
+    sql = f"{_productos_select(conn, mp)} ORDER BY p.{mp['id']}"
+    return _stream_export(conn, sql, ["id", "nombre", "precio", "stock", "categoria"], formato, "productos")
+
+# ---- Importación masiva ----
+IMPORT_BATCH = 1000
+IMPORT_MAX_ERRORS = 200   # errores que se muestran en pantalla
+
+def _import_rows(archivo):
+    """
+    Genera (linea, dict, error) desde un CSV, JSON (lista) o JSON Lines subido.
+    `error` es None o el mensaje de una línea JSONL que no se pudo leer (se sigue).
+    """
+    nombre = (archivo.filename or "").lower()
+    texto = io.TextIOWrapper(archivo.stream, encoding="utf-8-sig")
+    if nombre.endswith(".json"):
+        data = json.load(texto)
+        if not isinstance(data, list):
+            raise ValueError("El JSON debe ser una lista de objetos.")
+        for i, row in enumerate(data, start=1):
+            yield i, row, None
+    elif nombre.endswith((".jsonl", ".ndjson")):
+        for i, line in enumerate(texto, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield i, json.loads(line), None
+            except ValueError as e:
+                yield i, None, f"JSON inválido: {e}"
+    else:
+        # línea 1 = encabezados
+        for i, row in enumerate(csv.DictReader(texto), start=2):
+            yield i, row, None
+
+def _import_value(row, mp, campo):
+    """Acepta el nombre canónico del campo o el nombre real de la columna."""
+    for key in (campo, mp.get(campo)):
+        if key and key in row and row[key] not in (None, ""):
+            return row[key]
+    return None
+
+def _insert_batch(conn, sql, batch, errores):
+    """
+    Inserta el lote en una transacción con executemany. Si el lote falla,
+    se reintenta fila por fila (cada una en su transacción) para guardar las
+    filas válidas y reportar las que no entran. Devuelve cuántas se insertaron.
+    """
+    cur = conn.cursor()
+    try:
+        try:
+            conn.start_transaction()
+            cur.executemany(sql, [vals for _, vals in batch])
+            conn.commit()
+            return len(batch)
+        except Error:
+            conn.rollback()
+        ok = 0
+        for linea, vals in batch:
+            try:
+                conn.start_transaction()
+                cur.execute(sql, vals)
+                conn.commit()
+                ok += 1
+            except Error as e:
+                conn.rollback()
+                errores.append((linea, e.msg))
+        return ok
+    finally:
+        cur.close()
+
+@app.route("/productos/importar", methods=["GET","POST"])
+@login_required
+def importar_productos():
+    if request.method == "GET":
+        return render_template("productos/import.html", resultado=None)
+    archivo = request.files.get("archivo")
+    if not archivo or not archivo.filename:
+        flash("Seleccione un archivo CSV o JSON.", "warning")
+        return render_template("productos/import.html", resultado=None)
+
+    conn = get_db()
+    cur = None
+    try:
+        if not _table_exists(conn, "productos"):
+            flash("La tabla 'productos' no existe.", "danger")
+            return redirect(url_for("listar_productos"))
+        mp = map_productos(conn)
+
+        # categorías: una sola consulta nombre -> id
+        cat_ids = {}
+        if mp["cat_fk"] and _table_exists(conn, "categorias"):
+            mc = map_categorias(conn)
+            if mc["id"] and mc["nombre"]:
+                cur = conn.cursor()
+                cur.execute(f"SELECT {mc['id']}, {mc['nombre']} FROM categorias")
+                cat_ids = {str(nombre).strip().lower(): cid for cid, nombre in cur.fetchall()}
+                cur.close(); cur = None
+
+        cols = [mp["nombre"]]
+        if mp["precio"]: cols.append(mp["precio"])
+        if mp["stock"]:  cols.append(mp["stock"])
+        if mp["cat_fk"]: cols.append(mp["cat_fk"])
+        sql = f"INSERT INTO productos ({', '.join(cols)}) VALUES ({','.join(['%s'] * len(cols))})"
+
+        errores, batch = [], []
+        insertados = total = 0
+        try:
+            for linea, row, error in _import_rows(archivo):
+                total += 1
+                if error:
+                    errores.append((linea, error)); continue
+                if not isinstance(row, dict):
+                    errores.append((linea, "Fila inválida.")); continue
+                nombre = str(_import_value(row, mp, "nombre") or "").strip()
+                if not nombre:
+                    errores.append((linea, "El nombre es obligatorio.")); continue
+                try:
+                    precio_val = float(_import_value(row, mp, "precio") or 0)
+                    stock_val = int(_import_value(row, mp, "stock") or 0)
+                except (TypeError, ValueError):
+                    errores.append((linea, "Precio/Stock inválidos.")); continue
+                vals = [nombre]
+                if mp["precio"]: vals.append(precio_val)
+                if mp["stock"]:  vals.append(stock_val)
+                if mp["cat_fk"]:
+                    cat_id = row.get("categoria_id") or None
+                    if cat_id is not None:
+                        try:
+                            cat_id = int(cat_id)
+                        except (TypeError, ValueError):
+                            errores.append((linea, f"categoria_id inválido: {cat_id}.")); continue
+                    cat_nombre = row.get("categoria")
+                    if cat_id is None and cat_nombre not in (None, ""):
+                        cat_id = cat_ids.get(str(cat_nombre).strip().lower())
+                        if cat_id is None:
+                            errores.append((linea, f"Categoría desconocida: {cat_nombre}.")); continue
+                    vals.append(cat_id)
+                batch.append((linea, tuple(vals)))
+                if len(batch) >= IMPORT_BATCH:
+                    insertados += _insert_batch(conn, sql, batch, errores)
+                    batch = []
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            errores.append((None, f"No se pudo leer el archivo: {e}"))
+        if batch:
+            insertados += _insert_batch(conn, sql, batch, errores)
+
+        errores.sort(key=lambda e: e[0] or 0)
+        resultado = {
+            "total": total,
+            "insertados": insertados,
+            "num_errores": len(errores),
+            "errores": errores[:IMPORT_MAX_ERRORS],
+        }
+        flash(f"Importación terminada: {insertados} de {total} filas insertadas.",
+              "success" if not errores else "warning")
+        return render_template("productos/import.html", resultado=resultado)
     finally:
         if cur: cur.close()
-        conn.close()
 
 @app.route("/productos/crear", methods=["GET","POST"])
 @login_required
 def crear_producto():
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         if not _table_exists(conn, "productos"):
@@ -681,12 +1128,11 @@ def crear_producto():
         return render_template("productos/form.html", producto=None, categorias=categorias, cat_fk=mp["cat_fk"])
     finally:
         if cur: cur.close()
-        conn.close()
 
 @app.route("/productos/editar/<int:prod_id>", methods=["GET","POST"])
 @login_required
 def editar_producto(prod_id):
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         if not _table_exists(conn, "productos"):
@@ -742,13 +1188,12 @@ def editar_producto(prod_id):
         return render_template("productos/form.html", producto=producto, categorias=categorias, cat_fk=mp["cat_fk"])
     finally:
         if cur: cur.close()
-        conn.close()
 
 @app.route("/productos/eliminar/<int:prod_id>", methods=["GET","POST"])
 @login_required
 def eliminar_producto(prod_id):
     if request.method == "POST":
-        conn = get_connection()
+        conn = get_db()
         cur = None
         try:
             if not _table_exists(conn, "productos"):
@@ -766,9 +1211,8 @@ def eliminar_producto(prod_id):
             return redirect(url_for("listar_productos"))
         finally:
             if cur: cur.close()
-            conn.close()
 
-    conn = get_connection()
+    conn = get_db()
     cur = None
     try:
         if not _table_exists(conn, "productos"):
@@ -781,7 +1225,294 @@ def eliminar_producto(prod_id):
         return render_template("productos/confirm_delete.html", producto=producto)
     finally:
         if cur: cur.close()
-        conn.close()
+
+# =====================================================
+# ===============  API JSON (v1)  =====================
+# =====================================================
+# /api/v1/<recurso>            GET (lista paginada + filtros), POST (crear)
+# /api/v1/<recurso>/<id>       GET, PUT/PATCH (actualizar), DELETE
+# recurso: categorias | productos | proyectos | tareas
+
+def _api_json(payload, status=200):
+    return Response(json.dumps(payload, default=_json_default, ensure_ascii=False),
+                    status=status, mimetype="application/json")
+
+def _api_error(msg, status):
+    return _api_json({"ok": False, "error": msg}, status)
+
+def _api_conditional(payload):
+    """
+    ETag calculado sobre la respuesta entera (filas, page, modo...): si el
+    cliente ya la tiene, 304 sin cuerpo. Se serializa una vez, para el hash y
+    para el 200.
+    """
+    cuerpo = json.dumps(payload, default=_json_default, ensure_ascii=False).encode("utf-8")
+    etag = hashlib.sha1(cuerpo).hexdigest()
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(cuerpo, mimetype="application/json")
+    resp.set_etag(etag)
+    return resp
+
+def _api_recurso(conn, recurso):
+    """
+    Describe el recurso con los map_*: tabla, columna id, SELECT base,
+    campos escribibles {clave_json: (columna, tipo)} y filtros de la lista.
+    Devuelve None si el recurso no existe o su tabla no es compatible.
+    """
+    if recurso not in ("categorias", "productos", "proyectos", "tareas") or not _table_exists(conn, recurso):
+        return None
+    if recurso == "categorias":
+        m = map_categorias(conn)
+        if not m["id"] or not m["nombre"]:
+            return None
+        desc_sql = f"{m['descripcion']} AS descripcion" if m["descripcion"] else "NULL AS descripcion"
+        return {
+            "tabla": "categorias", "id": m["id"],
+            "select": f"SELECT {m['id']} AS id, {m['nombre']} AS nombre, {desc_sql} FROM categorias",
+            "campos": {"nombre": (m["nombre"], str), "descripcion": (m["descripcion"], str)},
+            "requeridos": ["nombre"],
+            "filtros": {"q": (f"{m['nombre']} LIKE %s ESCAPE '!'", _prefijo)},
+        }
+    if recurso == "proyectos":
+        m = map_proyectos(conn)
+        if not m["id"] or not m["nombre"]:
+            return None
+        parts = [f"{m['id']} AS id", f"{m['nombre']} AS nombre"]
+        parts.append(f"{m['descripcion']} AS descripcion" if m["descripcion"] else "NULL AS descripcion")
+        parts.append(f"{m['creado']} AS creado_en" if m["creado"] else "NULL AS creado_en")
+        return {
+            "tabla": "proyectos", "id": m["id"],
+            "select": f"SELECT {', '.join(parts)} FROM proyectos",
+            "campos": {"nombre": (m["nombre"], str), "descripcion": (m["descripcion"], str)},
+            "requeridos": ["nombre"],
+            "filtros": {"q": (f"{m['nombre']} LIKE %s ESCAPE '!'", _prefijo)},
+        }
+    if recurso == "productos":
+        m = map_productos(conn)
+        if not m["id"] or not m["nombre"]:
+            return None
+        return {
+            "tabla": "productos", "id": f"p.{m['id']}",
+            "select": _productos_select(conn, m),
+            "campos": {"nombre": (m["nombre"], str), "precio": (m["precio"], float),
+                       "stock": (m["stock"], int), "categoria_id": (m["cat_fk"], int)},
+            "requeridos": ["nombre"],
+            "filtros": _productos_filtros(m),
+        }
+    m = map_tareas(conn)
+    if not m["id"] or not m["titulo"]:
+        return None
+    filtros = {"estado": (f"t.{m['estado']} = %s", str)} if m["estado"] else {}
+    if m["proy_fk"]:
+        filtros["proyecto_id"] = (f"t.{m['proy_fk']} = %s", int)
+    return {
+        "tabla": "tareas", "id": f"t.{m['id']}",
+        "select": _tareas_select(conn, m),
+        "campos": {"titulo": (m["titulo"], str), "estado": (m["estado"], str),
+                   "asignado_a": (m["asignado"], str), "proyecto_id": (m["proy_fk"], int)},
+        "requeridos": ["titulo"] + (["proyecto_id"] if m["proy_fk"] else []),
+        "filtros": filtros,
+    }
+
+def _api_valores(spec, data, parcial):
+    """Convierte el cuerpo JSON a [(columna, valor)]; lanza ValueError si no es válido."""
+    if not isinstance(data, dict):
+        raise ValueError("Se esperaba un objeto JSON.")
+    valores = []
+    for clave, (col, tipo) in spec["campos"].items():
+        if not col or clave not in data:
+            continue
+        v = data[clave]
+        if v is not None and v != "":
+            try:
+                v = tipo(v).strip() if tipo is str else tipo(v)
+            except (TypeError, ValueError):
+                raise ValueError(f"Valor inválido para '{clave}'.")
+        else:
+            v = None
+        if clave in spec["requeridos"] and v in (None, ""):
+            raise ValueError(f"'{clave}' es obligatorio.")
+        valores.append((col, v))
+    if not parcial:
+        faltan = [c for c in spec["requeridos"] if c not in data]
+        if faltan:
+            raise ValueError(f"Faltan campos obligatorios: {', '.join(faltan)}.")
+    if not valores:
+        raise ValueError("No hay campos para guardar.")
+    return valores
+
+@app.route("/api/v1/<recurso>", methods=["GET", "POST"])
+@login_required
+def api_coleccion(recurso):
+    conn = get_db()
+    cur = None
+    try:
+        spec = _api_recurso(conn, recurso)
+        if spec is None:
+            return _api_error(f"Recurso '{recurso}' no disponible.", 404)
+
+        if request.method == "POST":
+            try:
+                valores = _api_valores(spec, request.get_json(silent=True), parcial=False)
+            except ValueError as e:
+                return _api_error(str(e), 400)
+            cur = conn.cursor()
+            cols = ", ".join(c for c, _ in valores)
+            placeholders = ",".join(["%s"] * len(valores))
+            try:
+                cur.execute(f"INSERT INTO {spec['tabla']} ({cols}) VALUES ({placeholders})",
+                            tuple(v for _, v in valores))
+                conn.commit()
+                if spec["tabla"] in ("categorias", "proyectos"):
+                    _invalidar_referencia(spec["tabla"])
+            except Error as e:
+                conn.rollback()
+                return _api_error(e.msg, 409)
+            return _api_json({"ok": True, "id": cur.lastrowid}, 201)
+
+        try:
+            where, params = _apply_filtros(spec["filtros"], request.args)
+        except ValueError as e:
+            return _api_error(f"Filtro inválido: {e}.", 400)
+        pg = _page_args()
+        ks_where, ks_params, order = _keyset(pg, spec["id"])
+        if ks_where:
+            where.append(ks_where); params += ks_params
+        cur = conn.cursor(dictionary=True)
+        cur.execute(
+            f"{spec['select']}"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + f" ORDER BY {order} LIMIT {pg['limit'] + 1}",
+            tuple(params)
+        )
+        rows, page = _page_rows(cur.fetchall(), pg)
+        page.pop("args")
+        return _api_conditional({"ok": True, "data": rows, "page": page})
+    finally:
+        if cur: cur.close()
+
+@app.route("/api/v1/<recurso>/<int:item_id>", methods=["GET", "PUT", "PATCH", "DELETE"])
+@login_required
+def api_item(recurso, item_id):
+    conn = get_db()
+    cur = None
+    try:
+        spec = _api_recurso(conn, recurso)
+        if spec is None:
+            return _api_error(f"Recurso '{recurso}' no disponible.", 404)
+        # columna id sin alias de tabla para UPDATE/DELETE
+        id_col = spec["id"].split(".")[-1]
+
+        if request.method == "GET":
+            cur = conn.cursor(dictionary=True)
+            cur.execute(f"{spec['select']} WHERE {spec['id']}=%s", (item_id,))
+            row = cur.fetchone()
+            if row is None:
+                return _api_error("No encontrado.", 404)
+            return _api_conditional({"ok": True, "data": row})
+
+        cur = conn.cursor()
+        try:
+            if request.method == "DELETE":
+                cur.execute(f"DELETE FROM {spec['tabla']} WHERE {id_col}=%s", (item_id,))
+            else:
+                try:
+                    valores = _api_valores(spec, request.get_json(silent=True),
+                                           parcial=request.method == "PATCH")
+                except ValueError as e:
+                    return _api_error(str(e), 400)
+                sets = ", ".join(f"{c}=%s" for c, _ in valores)
+                cur.execute(f"UPDATE {spec['tabla']} SET {sets} WHERE {id_col}=%s",
+                            tuple(v for _, v in valores) + (item_id,))
+            existe = cur.rowcount > 0
+            if not existe and request.method != "DELETE":
+                # MySQL informa 0 filas también si existe pero quedó igual
+                cur.execute(f"SELECT 1 FROM {spec['tabla']} WHERE {id_col}=%s", (item_id,))
+                existe = cur.fetchone() is not None
+            conn.commit()
+            if spec["tabla"] in ("categorias", "proyectos"):
+                _invalidar_referencia(spec["tabla"])
+        except Error as e:
+            conn.rollback()
+            return _api_error(e.msg, 409)
+        if not existe:
+            return _api_error("No encontrado.", 404)
+        return _api_json({"ok": True, "id": item_id})
+    finally:
+        if cur: cur.close()
+
+# ---- Búsqueda por texto (FULLTEXT) ----
+ER_FT_MATCHING_KEY_NOT_FOUND = 1191
+
+@app.route("/api/v1/buscar")
+@login_required
+def api_buscar():
+    """
+    /api/v1/buscar?q=<texto>&recurso=productos|tareas&limit=&offset=
+    Ordena por relevancia con MATCH ... AGAINST sobre nombre/titulo (+ descripción
+    si la tabla la tiene). MATCH tiene que nombrar exactamente las columnas de un
+    índice FULLTEXT: se usa el que cubra más de esas columnas y, si no hay
+    ninguno, LIKE sobre todas, sin ranking.
+    """
+    q = (request.args.get("q") or "").strip()
+    recurso = request.args.get("recurso", "productos")
+    if not q:
+        return _api_error("El parámetro 'q' es obligatorio.", 400)
+    if recurso not in ("productos", "tareas"):
+        return _api_error("recurso debe ser productos o tareas.", 400)
+    limit = max(1, min(request.args.get("limit", type=int) or PAGE_SIZE, PAGE_MAX))
+    offset = max(0, request.args.get("offset", type=int) or 0)
+
+    conn = get_db()
+    cur = None
+    try:
+        if not _table_exists(conn, recurso):
+            return _api_error(f"La tabla '{recurso}' no existe.", 404)
+        if recurso == "productos":
+            m = map_productos(conn)
+            alias, texto = "p", m["nombre"]
+            select = lambda extra: _productos_select(conn, m, extra)
+        else:
+            m = map_tareas(conn)
+            alias, texto = "t", m["titulo"]
+            select = lambda extra: _tareas_select(conn, m, extra)
+        textos = [texto] + ([m["descripcion"]] if m["descripcion"] else [])
+        buscables = {c.lower() for c in textos}
+        indice = max((cols for cols in esquema.indices_fulltext(conn, recurso)
+                      if {c.lower() for c in cols} <= buscables), key=len, default=None)
+        paging = f"LIMIT {limit + 1} OFFSET {offset}"
+
+        cur = conn.cursor(dictionary=True)
+        modo = "fulltext" if indice else "like"
+        if indice:
+            match = f"MATCH({', '.join(f'{alias}.{c}' for c in indice)}) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+            try:
+                cur.execute(
+                    f"{select(f'{match} AS score,')} WHERE {match} "
+                    f"ORDER BY score DESC, {alias}.{m['id']} DESC {paging}",
+                    (q, q)
+                )
+            except Error as e:
+                # el índice se borró después del snapshot del esquema
+                if e.errno != ER_FT_MATCHING_KEY_NOT_FOUND:
+                    raise
+                modo = "like"
+        if modo == "like":
+            cols = [f"{alias}.{c}" for c in textos]
+            like = " OR ".join(f"{c} LIKE %s ESCAPE '!'" for c in cols)
+            cur.execute(
+                f"{select('0 AS score,')} WHERE ({like}) ORDER BY {alias}.{m['id']} DESC {paging}",
+                tuple(_contiene(q) for _ in cols)
+            )
+        rows = cur.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        page = {"limit": limit, "offset": offset, "next_offset": offset + limit if has_more else None}
+        return _api_conditional({"ok": True, "modo": modo, "data": rows, "page": page})
+    finally:
+        if cur: cur.close()
 
 # -----------------------------------------------------
 # Run
@@ -1,10 +1,14 @@
 # auth.py (REEMPLAZO COMPLETO)
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from werkzeug.security import check_password_hash, generate_password_hash
+import math
+from flask import Blueprint, current_app, make_response, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, logout_user
-from conexion import get_connection
-from models import User  # si no tiene from_row, hay un fallback más abajo
+from mysql.connector import Error
+from conexion import get_db
+import esquema
+import hashing
+import limitador
+from models import User, invalidar_usuario  # si no tiene from_row, hay un fallback más abajo
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -20,10 +24,7 @@ def _pick(cols: set, candidates: list[str]) -> str | None:
 
 def _colmap(conn):
     """Detecta nombres reales en tu tabla `usuarios`."""
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SHOW COLUMNS FROM usuarios")
-    cols = {row["Field"] for row in cur.fetchall()}
-    cur.close()
+    cols = esquema.columnas(conn, "usuarios")
     return {
         "id":   _pick(cols, ["id", "id_usuario", "usuario_id", "idUsuario", "user_id", "idUser"]),
         "user": _pick(cols, ["username", "usuario", "user", "login", "mail", "email", "correo", "correo_electronico"]),
@@ -41,6 +42,7 @@ def _ensure_password_col(conn, m):
     try:
         cur.execute("ALTER TABLE usuarios ADD COLUMN password_hash VARCHAR(255) NULL")
         conn.commit()
+        esquema.invalidar()
     except Exception:
         conn.rollback()
     finally:
@@ -51,31 +53,47 @@ def _ensure_password_col(conn, m):
 # ---------- Consultas ----------
 
 def get_user_by_username(username: str):
-    conn = get_connection()
+    conn = get_db()
+    m = _colmap(conn)
+    m = _ensure_password_col(conn, m)
+    if not m["user"] or not m["pass"] or not m["id"]:
+        return None
+
+    cur = conn.cursor(dictionary=True)
+    sql = f"""
+        SELECT
+            {m['id']}   AS id,
+            {m['user']} AS username,
+            {m['pass']} AS password_hash,
+            {m['name']} AS nombre
+        FROM usuarios
+        WHERE {m['user']}=%s
+        LIMIT 1
+    """
+    cur.execute(sql, (username,))
+    row = cur.fetchone()
+    cur.close()
+    return row
+
+
+def _rehash(user_id, password: str):
+    """Guarda el hash con los parámetros actuales (HASH_METHOD); si falla se reintenta en otro login."""
     try:
+        nuevo = hashing.hashear(password)
+        conn = get_db()
         m = _colmap(conn)
-        m = _ensure_password_col(conn, m)
-        if not m["user"] or not m["pass"] or not m["id"]:
-            return None
-
-        cur = conn.cursor(dictionary=True)
-        sql = f"""
-            SELECT
-                {m['id']}   AS id,
-                {m['user']} AS username,
-                {m['pass']} AS password_hash,
-                {m['name']} AS nombre
-            FROM usuarios
-            WHERE {m['user']}=%s
-            LIMIT 1
-        """
-        cur.execute(sql, (username,))
-        row = cur.fetchone()
-        cur.close()
-        return row
-    finally:
-        conn.close()
+        cur = conn.cursor()
+        try:
+            cur.execute(f"UPDATE usuarios SET {m['pass']}=%s WHERE {m['id']}=%s", (nuevo, user_id))
+            conn.commit()
+        finally:
+            cur.close()
+        hashing.contar_rehash()
+    except (hashing.HashOcupado, Error) as e:
+        current_app.logger.info("No se pudo actualizar el hash del usuario %s: %s", user_id, e)
+
 
+MSG_OCUPADO = "Hay muchos inicios de sesión en curso; intenta de nuevo en unos segundos."
 
 # ---------- Rutas ----------
 
@@ -85,20 +103,36 @@ def login():
         username = (request.form.get("username") or "").strip()
         password = request.form.get("password") or ""
 
+        # antes de tocar MySQL o el hasher
+        espera = limitador.intento_login(username, request.remote_addr)
+        if espera:
+            segundos = math.ceil(espera)
+            flash(f"Demasiados intentos. Espera {segundos} s antes de volver a intentar.", "danger")
+            resp = make_response(render_template("auth/login.html", username=username), 429)
+            resp.headers["Retry-After"] = str(segundos)
+            return resp
+
         row = get_user_by_username(username)
 
         valid = False
         if row:
-            # Si guarda hash -> check_password_hash; si no, comparar plano
+            # hash de werkzeug (en el pool de hashing) o, si la columna es vieja, texto plano
             try:
-                valid = check_password_hash(row["password_hash"], password)
-            except Exception:
-                valid = (row["password_hash"] == password)
+                valid = hashing.verificar(row["password_hash"], password)
+            except hashing.HashOcupado:
+                flash(MSG_OCUPADO, "warning")
+                return render_template("auth/login.html", username=username), 503
 
         if not row or not valid:
             flash("Usuario o contraseña incorrectos.", "danger")
             return render_template("auth/login.html", username=username), 401
 
+        limitador.login_correcto(username, request.remote_addr)
+
+        # texto plano o parámetros viejos: ya tenemos la contraseña, se guarda el hash actual
+        if hashing.necesita_rehash(row["password_hash"]):
+            _rehash(row["id"], password)
+
         # Login con Flask-Login
         try:
             user = User.from_row(row)  # tu clase puede tener este helper
@@ -115,6 +149,7 @@ def login():
                     return str(self.id)
             user = _U(row["id"], row["username"])
 
+        invalidar_usuario(row["id"])
         login_user(user)
         # También dejamos algunos datos en sesión para plantillas simples
         session["user_id"] = row["id"]
@@ -130,6 +165,8 @@ def login():
 
 @auth_bp.route("/logout")
 def logout():
+    if session.get("user_id") is not None:
+        invalidar_usuario(session["user_id"])
     logout_user()
     session.clear()
     flash("Sesión cerrada.", "info")
@@ -154,7 +191,7 @@ def register():
             flash("La contraseña debe tener al menos 4 caracteres.", "warning")
             return render_template("auth/register.html", username=username, nombre=nombre)
 
-        conn = get_connection()
+        conn = get_db()
         try:
             m = _colmap(conn)
             m = _ensure_password_col(conn, m)
@@ -173,7 +210,7 @@ def register():
                 return render_template("auth/register.html", username=username, nombre=nombre)
 
             # Insertar usuario
-            hashed = generate_password_hash(p1)
+            hashed = hashing.hashear(p1)
             if m["name"]:
                 cur.execute(
                     f"INSERT INTO usuarios ({m['user']}, {m['pass']}, {m['name']}) VALUES (%s, %s, %s)",
@@ -185,16 +222,18 @@ def register():
                     (username, hashed)
                 )
             conn.commit()
+            invalidar_usuario(cur.lastrowid)
             cur.close()
 
             flash("Registro exitoso. Ya puedes iniciar sesión.", "success")
             return redirect(url_for("auth.login"))
 
+        except hashing.HashOcupado:
+            flash(MSG_OCUPADO, "warning")
+            return render_template("auth/register.html", username=username, nombre=nombre), 503
         except Exception:
             conn.rollback()
             flash("No se pudo registrar (revisa permisos o longitud de columnas).", "danger")
             return render_template("auth/register.html", username=username, nombre=nombre)
-        finally:
-            conn.close()
 
     return render_template("auth/register.html")
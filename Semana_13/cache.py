@@ -0,0 +1,104 @@
+# cache.py
+"""Cache LRU en memoria con expiración por entrada, segura entre hilos."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()   # clave -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expira, valor = item
+            if expira < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return valor
+
+    def set(self, key, value) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"tamano": len(self._data), "max": self.maxsize, "ttl_s": self.ttl,
+                "hits": self.hits, "misses": self.misses}
+
+
+class VersionedCache:
+    """
+    Datos de referencia por clave (p. ej. la lista de categorías de un select).
+    invalidate(clave) sube la versión de esa clave: lo guardado deja de servirse
+    y una carga que empezó antes de invalidar no se guarda encima. El TTL acota
+    cuánto puede durar un valor si la tabla cambia por fuera de este proceso
+    (otro worker, un script).
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._data: dict = {}       # clave -> (version, expira_en, valor)
+        self._versiones: dict = {}  # clave -> version actual
+        self._generacion = 0        # sube con invalidate() de todo
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, loader):
+        ahora = time.monotonic()
+        with self._lock:
+            version = (self._generacion, self._versiones.get(key, 0))
+            item = self._data.get(key)
+            if item is not None and item[0] == version and item[1] > ahora:
+                self.hits += 1
+                return item[2]
+            self.misses += 1
+        valor = loader()
+        if self.ttl > 0:
+            with self._lock:
+                if (self._generacion, self._versiones.get(key, 0)) == version:
+                    self._data[key] = (version, time.monotonic() + self.ttl, valor)
+        return valor
+
+    def invalidate(self, key=None) -> None:
+        """Invalida una clave, o todas si key es None."""
+        with self._lock:
+            if key is None:
+                self._generacion += 1
+                self._data.clear()
+            else:
+                self._versiones[key] = self._versiones.get(key, 0) + 1
+                self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"claves": sorted(self._data), "generacion": self._generacion,
+                "versiones": dict(self._versiones), "ttl_s": self.ttl,
+                "hits": self.hits, "misses": self.misses}
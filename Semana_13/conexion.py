@@ -1,13 +1,24 @@
 # conexion.py
 import os
+import threading
+import time
+import traceback
 import mysql.connector
-from mysql.connector import Error
+from flask import current_app, g, has_request_context
+from mysql.connector import Error, pooling
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import PooledMySQLConnection
 from dotenv import load_dotenv
+import instrumentacion
 
 # carga .env desde el directorio actual
 load_dotenv()
 
-def get_connection():
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _db_config():
     host = os.getenv("DB_HOST", "127.0.0.1")
     port = int(os.getenv("DB_PORT", "3306"))
     name = os.getenv("DB_NAME")
@@ -19,14 +30,198 @@ def get_connection():
     if missing:
         raise RuntimeError(f"Faltan variables en .env: {', '.join(missing)}")
 
-    # Log útil (aparece en la consola de Flask)
-    print(f"[DB] host={host} port={port} db={name} user={user!r}")
-
-    return mysql.connector.connect(
+    return dict(
         host=host,
         port=port,
         database=name,
         user=user,
         password=pwd,
-        autocommit=True
+        autocommit=True,
+        # la conexión del request se comparte entre helpers (user_loader, mapas,
+        # la vista): un SELECT leído a medias no debe trabar el siguiente
+        consume_results=True
     )
+
+
+class _Pool(pooling.MySQLConnectionPool):
+    """
+    Pool de mysql.connector con espera acotada al pedir conexión y contadores.
+    El chequeo de salud lo hace el pool base al prestar: `is_connected()` hace
+    un ping y, si la conexión murió, reconecta antes de entregarla.
+    Quien espera duerme en `_liberada` hasta que se devuelva una conexión.
+    """
+
+    def __init__(self, timeout: float, **kwargs):
+        self.timeout = timeout
+        self._liberada = threading.Condition()
+        self._devueltas = 0    # cambia en cada devolución; evita perder un aviso
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "prestadas": 0,        # checkouts exitosos
+            "en_uso": 0,
+            "max_en_uso": 0,
+            "esperas": 0,          # checkouts que encontraron el pool vacío
+            "timeouts": 0,
+            "fallos_salud": 0,     # reconexiones fallidas al prestar
+            "espera_total_ms": 0.0,
+        }
+        super().__init__(**kwargs)
+
+    def get_connection(self):
+        inicio = time.monotonic()
+        espero = False
+        while True:
+            with self._liberada:
+                visto = self._devueltas
+            try:
+                cnx = super().get_connection()
+                break
+            except PoolError:
+                restante = self.timeout - (time.monotonic() - inicio)
+                with self._liberada:
+                    # si se devolvió una entre el intento y acá, wait_for no duerme
+                    libre = restante > 0 and self._liberada.wait_for(lambda: self._devueltas != visto, restante)
+                if not libre:
+                    with self._stats_lock:
+                        self._stats["timeouts"] += 1
+                    raise PoolError(
+                        f"Pool '{self.pool_name}' agotado: sin conexión libre tras {self.timeout:.1f}s"
+                    )
+                espero = True
+            except Error:
+                with self._stats_lock:
+                    self._stats["fallos_salud"] += 1
+                # el pool base vuelve a encolar la conexión que no pudo reconectar
+                self._avisar()
+                raise
+        with self._stats_lock:
+            s = self._stats
+            s["prestadas"] += 1
+            s["en_uso"] += 1
+            s["max_en_uso"] = max(s["max_en_uso"], s["en_uso"])
+            if espero:
+                s["esperas"] += 1
+                s["espera_total_ms"] += (time.monotonic() - inicio) * 1000
+        return cnx
+
+    def add_connection(self, cnx=None):
+        super().add_connection(cnx)
+        # add_connection(None) se usa al llenar el pool; con cnx es una devolución
+        if cnx is not None:
+            with self._stats_lock:
+                self._stats["en_uso"] -= 1
+        self._avisar()
+
+    def _avisar(self):
+        # notify_all: si el despertado justo venció su timeout, otro toma la conexión
+        with self._liberada:
+            self._devueltas += 1
+            self._liberada.notify_all()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            data = dict(self._stats)
+        data["nombre"] = self.pool_name
+        data["tamano"] = self.pool_size
+        data["libres"] = self._cnx_queue.qsize()
+        data["timeout_s"] = self.timeout
+        return data
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                cfg = _db_config()
+                size = int(os.getenv("DB_POOL_SIZE", "5"))
+                timeout = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+                # Log útil (aparece en la consola de Flask), una vez por proceso
+                print(f"[DB] host={cfg['host']} port={cfg['port']} db={cfg['database']} "
+                      f"user={cfg['user']!r} pool={size}")
+                _pool = _Pool(
+                    timeout,
+                    pool_name=os.getenv("DB_POOL_NAME", "semana13"),
+                    pool_size=size,
+                    **cfg
+                )
+    return _pool
+
+
+def get_connection():
+    """
+    Devuelve una conexión del pool; `conn.close()` la regresa al pool.
+    Con DB_POOL_SIZE=0 se abre una conexión directa como antes.
+    Dentro de un request la conexión viene medida (ver instrumentacion.py).
+    """
+    inicio = time.perf_counter()
+    if int(os.getenv("DB_POOL_SIZE", "5")) <= 0:
+        cfg = _db_config()
+        print(f"[DB] host={cfg['host']} port={cfg['port']} db={cfg['database']} user={cfg['user']!r}")
+        conn = mysql.connector.connect(**cfg)
+    else:
+        conn = _get_pool().get_connection()
+    conn = instrumentacion.medir(conn, (time.perf_counter() - inicio) * 1000)
+    if has_request_context() and _rastrear_fugas():
+        g.setdefault("_db_prestadas", []).append((conn, "".join(traceback.format_stack(limit=6)[:-1])))
+    return conn
+
+
+# ---------- Conexión por request ----------
+def get_db():
+    """
+    Conexión del request actual: se pide al pool la primera vez que se usa y
+    close_db (teardown_appcontext) la devuelve al terminar, aunque la vista
+    falle o la respuesta sea un stream. Las vistas no deben cerrarla.
+    """
+    if "db" not in g:
+        g.db = get_connection()
+    return g.db
+
+
+def _rastrear_fugas() -> bool:
+    return current_app.debug or os.getenv("DB_LEAK_CHECK", "0") == "1"
+
+
+def _sigue_abierta(conn) -> bool:
+    conn = getattr(conn, "_conn", conn)   # sin el proxy de instrumentacion
+    if isinstance(conn, PooledMySQLConnection):
+        return conn._cnx is not None      # close() lo pone en None al devolverla
+    try:
+        return conn.is_connected()
+    except Error:
+        return False
+
+
+def close_db(exc=None):
+    conn = g.pop("db", None)
+    if conn is not None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Error:
+            pass
+        conn.close()
+    # Rastreador de fugas (debug o DB_LEAK_CHECK=1): conexiones pedidas con
+    # get_connection() en este request que nadie cerró
+    for prestada, origen in g.pop("_db_prestadas", []):
+        if prestada is conn or not _sigue_abierta(prestada):
+            continue
+        current_app.logger.warning("Conexión MySQL sin cerrar al terminar el request; se pidió en:\n%s", origen)
+        try:
+            prestada.close()
+        except Error:
+            pass
+
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
+
+
+def pool_stats() -> dict:
+    """Contadores del pool para ajustar DB_POOL_SIZE / DB_POOL_TIMEOUT."""
+    if _pool is None:
+        return {"activo": False}
+    data = _pool.stats()
+    data["activo"] = True
+    return data
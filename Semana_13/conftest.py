@@ -0,0 +1,146 @@
+# conftest.py
+"""
+Fixtures de las pruebas (correr con: python -m pytest Semana_13).
+
+No hace falta un MySQL: ConexionFalsa imita lo que usa la app de
+mysql.connector (cursor con %s, dictionary=True, rowcount, commit/rollback)
+sobre un SQLite en memoria.
+"""
+import re
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+from mysql.connector import errors
+
+
+@contextmanager
+def _como_mysql():
+    """Los errores de SQLite salen como los de mysql.connector (la app atrapa esos)."""
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        raise errors.IntegrityError(msg=str(e))
+    except sqlite3.Error as e:
+        raise errors.DatabaseError(msg=str(e))
+
+
+# MATCH(cols) AGAINST (%s IN NATURAL LANGUAGE MODE) -> función de SQLite; como
+# en MySQL, las columnas tienen que ser exactamente las de un índice FULLTEXT
+_MATCH = re.compile(r"MATCH\(([^)]*)\) AGAINST \(%s IN NATURAL LANGUAGE MODE\)")
+
+
+def _puntaje(q, *textos):
+    palabras = set(" ".join(t or "" for t in textos).lower().split())
+    return sum(p in palabras for p in q.lower().split())
+
+
+class _CursorFalso:
+    def __init__(self, db, dictionary=False, fulltext=None):
+        self._cur = db.cursor()
+        self._dict = dictionary
+        self._fulltext = fulltext if fulltext is not None else {}
+        self._filas = None
+
+    def _match(self, m):
+        cols = [c.strip() for c in m.group(1).split(",")]
+        indices = [set(i) for t in self._fulltext.values() for i in t.values()]
+        if {c.split(".")[-1] for c in cols} not in indices:
+            raise errors.ProgrammingError(msg="Can't find FULLTEXT index matching the column list", errno=1191)
+        return f"puntaje(%s, {', '.join(cols)})"
+
+    def execute(self, sql, params=()):
+        if "information_schema.columns" in sql:
+            tablas = [t for (t,) in self._cur.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            self._filas = [(t, col[1]) for t in tablas for col in self._cur.execute(f"PRAGMA table_info({t})").fetchall()]
+            self.rowcount = len(self._filas)
+            return
+        if "information_schema.tables" in sql:
+            self._filas = self._cur.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", tuple(params)).fetchall()
+            self.rowcount = len(self._filas)
+            return
+        if "information_schema.statistics" in sql:
+            self._filas = [(t, i, c) for t, indices in self._fulltext.items()
+                           for i, cols in indices.items() for c in cols]
+            self.rowcount = len(self._filas)
+            return
+        self._filas = None
+        sql = _MATCH.sub(self._match, sql)
+        with _como_mysql():
+            self._cur.execute(sql.replace("%s", "?"), tuple(params or ()))
+        self.rowcount = self._cur.rowcount
+        self.lastrowid = self._cur.lastrowid
+
+    def executemany(self, sql, seq):
+        with _como_mysql():
+            self._cur.executemany(sql.replace("%s", "?"), list(seq))
+        self.rowcount = self._cur.rowcount
+
+    def _fila(self, row):
+        if row is None or not self._dict:
+            return row
+        return dict(zip([d[0] for d in self._cur.description], row))
+
+    def fetchone(self):
+        if self._filas is not None:
+            return self._filas.pop(0) if self._filas else None
+        return self._fila(self._cur.fetchone())
+
+    def fetchall(self):
+        if self._filas is not None:
+            filas, self._filas = self._filas, []
+            return filas
+        return [self._fila(r) for r in self._cur.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._fila(r) for r in self._cur.fetchmany(size)]
+
+    def close(self):
+        self._cur.close()
+
+
+class ConexionFalsa:
+    in_transaction = False
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.db.create_function("puntaje", -1, _puntaje)
+        self.fulltext = {}   # tabla -> {índice: [columnas]}
+
+    def cursor(self, dictionary=False, **kwargs):
+        return _CursorFalso(self.db, dictionary, self.fulltext)
+
+    def start_transaction(self):
+        pass
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def conexion_falsa(monkeypatch):
+    import conexion
+    import esquema
+    conn = ConexionFalsa()
+    monkeypatch.setattr(conexion, "get_connection", lambda: conn)
+    esquema.invalidar()
+    yield conn
+    esquema.invalidar()
+
+
+@pytest.fixture
+def cliente(conexion_falsa):
+    from app import app
+    app.config.update(TESTING=True, LOGIN_DISABLED=True)
+    with app.test_client() as c:
+        yield c
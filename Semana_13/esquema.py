@@ -0,0 +1,124 @@
+# esquema.py
+"""
+Cache de metadatos del esquema (tablas, columnas e índices FULLTEXT) compartido
+por todo el proceso.
+
+Los helpers de mapeo (map_* en app.py, _colmap en auth.py/models.py) sólo
+necesitan saber qué columnas tiene cada tabla. En vez de un SHOW COLUMNS por
+consulta, se lee todo el esquema con una sola consulta a information_schema y
+se reutiliza entre requests e hilos hasta que vence SCHEMA_CACHE_TTL o se
+invalida a mano (p. ej. tras un ALTER TABLE).
+"""
+import os
+import threading
+import time
+
+_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "300"))
+
+_lock = threading.Lock()
+_tablas: dict[str, frozenset] | None = None   # tabla -> columnas
+_fulltext: dict[str, list[tuple]] = {}        # tabla -> columnas de cada índice FULLTEXT
+_cargado_en = 0.0
+_cargas = 0
+
+
+def _cargar(conn) -> tuple[dict[str, frozenset], dict[str, list[tuple]]]:
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = DATABASE()"
+        )
+        tablas: dict[str, set] = {}
+        for tabla, col in cur.fetchall():
+            tablas.setdefault(tabla, set()).add(col)
+        cur.execute(
+            "SELECT table_name, index_name, column_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND index_type = 'FULLTEXT' "
+            "ORDER BY table_name, index_name, seq_in_index"
+        )
+        indices: dict[tuple, list] = {}
+        for tabla, indice, col in cur.fetchall():
+            indices.setdefault((tabla, indice), []).append(col)
+        fulltext: dict[str, list[tuple]] = {}
+        for (tabla, _), cols in indices.items():
+            fulltext.setdefault(tabla, []).append(tuple(cols))
+        return {t: frozenset(c) for t, c in tablas.items()}, fulltext
+    finally:
+        cur.close()
+
+
+def _snapshot(conn) -> dict[str, frozenset]:
+    global _tablas, _fulltext, _cargado_en, _cargas
+    tablas = _tablas
+    if tablas is not None and time.monotonic() - _cargado_en < _TTL:
+        return tablas
+    with _lock:
+        # otro hilo pudo recargar mientras esperábamos el lock
+        if _tablas is None or time.monotonic() - _cargado_en >= _TTL:
+            _tablas, _fulltext = _cargar(conn)
+            _cargado_en = time.monotonic()
+            _cargas += 1
+        return _tablas
+
+
+def tabla_existe(conn, tabla: str) -> bool:
+    """
+    Si la tabla no figura en el snapshot se pregunta sólo por ella: una tabla
+    creada después de la carga invalida el snapshot (como en `columnas`).
+    """
+    if tabla in _snapshot(conn):
+        return True
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+            (tabla,),
+        )
+        existe = cur.fetchone() is not None
+    finally:
+        cur.close()
+    if existe:
+        invalidar()
+    return existe
+
+
+def columnas(conn, tabla: str) -> frozenset:
+    """
+    Columnas de `tabla`. Si la tabla no figura en el snapshot se consulta
+    directamente (SHOW COLUMNS falla igual que antes si no existe).
+    """
+    cols = _snapshot(conn).get(tabla)
+    if cols is not None:
+        return cols
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute(f"SHOW COLUMNS FROM {tabla}")
+        cols = frozenset(row["Field"] for row in cur.fetchall())
+    finally:
+        cur.close()
+    invalidar()
+    return cols
+
+
+def indices_fulltext(conn, tabla: str) -> list[tuple]:
+    """Columnas de cada índice FULLTEXT de `tabla` (MATCH tiene que nombrar exactamente uno)."""
+    _snapshot(conn)
+    return _fulltext.get(tabla, [])
+
+
+def invalidar() -> None:
+    """Fuerza a releer el esquema en la próxima consulta."""
+    global _tablas
+    with _lock:
+        _tablas = None
+
+
+def stats() -> dict:
+    tablas = _tablas
+    return {
+        "ttl_s": _TTL,
+        "cargas": _cargas,
+        "tablas": sorted(tablas) if tablas is not None else None,
+        "edad_s": round(time.monotonic() - _cargado_en, 1) if tablas is not None else None,
+    }
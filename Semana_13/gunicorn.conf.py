@@ -0,0 +1,10 @@
+# gunicorn.conf.py  ->  gunicorn "wsgi:create_app()"
+import os
+
+bind = f"{os.getenv('WEB_HOST', '0.0.0.0')}:{os.getenv('WEB_PORT', '8000')}"
+workers = int(os.getenv("WEB_WORKERS", "2"))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.getenv("WEB_TIMEOUT", "30"))
+# sin preload: cada worker crea su propio pool de MySQL después del fork
+preload_app = False
@@ -0,0 +1,153 @@
+# hashing.py
+"""
+Hash y verificación de contraseñas fuera del hilo del request.
+
+generate_password_hash / check_password_hash son caros a propósito (scrypt,
+pbkdf2). Corren en un ThreadPoolExecutor de HASH_WORKERS hilos (hashlib suelta
+el GIL mientras calcula), así una ráfaga de logins ocupa a lo sumo esos núcleos
+y el resto de los requests sigue respondiendo. Si ya hay HASH_QUEUE_MAX pedidos
+esperando se rechaza el nuevo con HashOcupado en vez de encolar sin límite.
+
+  HASH_WORKERS=2          hilos que calculan hashes (0 = en el hilo del request)
+  HASH_QUEUE_MAX=32       pedidos que pueden esperar un hilo libre
+  HASH_TIMEOUT=10         segundos máximos esperando un resultado
+  HASH_METHOD=scrypt      método de werkzeug, p. ej. "pbkdf2:sha256:600000"
+  HASH_SALT_LENGTH=16
+"""
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+QUEUE_MAX = int(os.getenv("HASH_QUEUE_MAX", "32"))
+TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
+METHOD = os.getenv("HASH_METHOD", "scrypt")
+SALT_LENGTH = int(os.getenv("HASH_SALT_LENGTH", "16"))
+
+
+class HashOcupado(RuntimeError):
+    """No hay lugar en la cola de hashing (o el resultado tardó más que HASH_TIMEOUT)."""
+
+
+_lock = threading.Lock()
+_executor = None
+_cupos = threading.BoundedSemaphore(max(WORKERS, 1) + QUEUE_MAX)
+_stats = {"en_cola": 0, "max_en_cola": 0, "en_curso": 0, "completados": 0,
+          "rechazados": 0, "timeouts": 0, "rehashes": 0, "espera_total_ms": 0.0}
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                # se crea al primer uso: con gunicorn cada worker tiene el suyo
+                _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="hash")
+    return _executor
+
+
+def _ejecutar(fn, *args):
+    if WORKERS <= 0:
+        return fn(*args)
+    if not _cupos.acquire(blocking=False):
+        with _lock:
+            _stats["rechazados"] += 1
+        raise HashOcupado("Cola de hashing llena")
+    encolado = time.monotonic()
+
+    def tarea():
+        with _lock:
+            _stats["en_cola"] -= 1
+            _stats["en_curso"] += 1
+            _stats["espera_total_ms"] += (time.monotonic() - encolado) * 1000
+        try:
+            return fn(*args)
+        finally:
+            with _lock:
+                _stats["en_curso"] -= 1
+                _stats["completados"] += 1
+            _cupos.release()
+
+    with _lock:
+        _stats["en_cola"] += 1
+        _stats["max_en_cola"] = max(_stats["max_en_cola"], _stats["en_cola"])
+    try:
+        futuro = _get_executor().submit(tarea)
+    except RuntimeError:
+        with _lock:
+            _stats["en_cola"] -= 1
+        _cupos.release()
+        raise
+    try:
+        return futuro.result(timeout=TIMEOUT)
+    except FuturesTimeout:
+        # el cálculo sigue y libera su cupo al terminar
+        with _lock:
+            _stats["timeouts"] += 1
+        raise HashOcupado(f"El hash tardó más de {TIMEOUT:.0f}s")
+
+
+def hashear(password: str) -> str:
+    return _ejecutar(generate_password_hash, password, METHOD, SALT_LENGTH)
+
+
+def _prefijo_de(metodo: str) -> str:
+    """
+    "método:parámetros" que werkzeug antepone a los hashes de `metodo`, con los
+    parámetros por defecto completos (como lo hace generate_password_hash, pero
+    sin calcular ningún hash).
+    """
+    nombre, *args = metodo.split(":")
+    if nombre == "scrypt":
+        n, r, p = map(int, args) if args else (2**15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if nombre == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iteraciones = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iteraciones}"
+    return metodo
+
+
+PREFIJO = _prefijo_de(METHOD)   # p. ej. "scrypt:32768:8:1"
+
+
+def _es_hash(guardado: str) -> bool:
+    # formato de werkzeug: "método[:parámetros]$sal$hash"; el texto plano de las
+    # columnas viejas no tiene "$" (cualquier otro valor se trata como hash)
+    return "$" in guardado
+
+
+def verificar(guardado, password: str) -> bool:
+    """Compara contra un hash de werkzeug o, si la columna es vieja, contra el texto plano."""
+    if not guardado:
+        return False
+    if not _es_hash(guardado):
+        return hmac.compare_digest(str(guardado).encode(), password.encode())
+    try:
+        return _ejecutar(check_password_hash, guardado, password)
+    except ValueError:
+        return False
+
+
+def necesita_rehash(guardado) -> bool:
+    """True si está en texto plano o con otro método/parámetros que HASH_METHOD."""
+    if not guardado or not _es_hash(guardado):
+        return True
+    return guardado.split("$", 1)[0] != PREFIJO
+
+
+def contar_rehash() -> None:
+    with _lock:
+        _stats["rehashes"] += 1
+
+
+def stats() -> dict:
+    with _lock:
+        data = dict(_stats)
+    data["espera_total_ms"] = round(data["espera_total_ms"], 1)
+    data.update(workers=WORKERS, cola_max=QUEUE_MAX, metodo=METHOD)
+    return data
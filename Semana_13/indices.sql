@@ -0,0 +1,16 @@
+-- indices.sql
+-- Índices de schema.sql para una base creada antes de que existieran.
+-- schema.sql borra y recrea las tablas; esto sólo agrega índices y no toca datos:
+--   mysql -u root -p -h 127.0.0.1 desarrollo_web < indices.sql
+-- MySQL no tiene CREATE INDEX IF NOT EXISTS: si alguno ya existe, la sentencia
+-- falla con "Duplicate key name" (se puede correr con --force para seguir con el resto).
+
+-- filtros de listar_productos (categoría, rango de precio, stock bajo, nombre)
+CREATE INDEX idx_productos_categoria ON productos (categoria_id);
+CREATE INDEX idx_productos_precio ON productos (precio);
+CREATE INDEX idx_productos_stock ON productos (stock);
+CREATE INDEX idx_productos_nombre ON productos (nombre);
+
+-- búsqueda por palabras (/api/v1/buscar)
+CREATE FULLTEXT INDEX ft_productos_texto ON productos (nombre, descripcion);
+CREATE FULLTEXT INDEX ft_tareas_titulo ON tareas (titulo);
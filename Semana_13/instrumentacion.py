@@ -0,0 +1,217 @@
+# instrumentacion.py
+"""
+Medición de SQL por request.
+
+conexion.get_connection() envuelve cada conexión prestada dentro de un request:
+los cursores anotan en flask.g cuántas consultas se hicieron, cuánto tardaron
+(execute + fetch), cuántas filas devolvieron y cuánto se esperó por la conexión.
+Al terminar el request se agrega el header Server-Timing (visible en la pestaña
+Network del navegador) y las sentencias que superan SQL_SLOW_MS se escriben,
+una por línea en JSON, en el logger "semana13.sql_lento" (a SQL_SLOW_LOG si
+está definido, si no a stderr). No se registran los valores de los parámetros.
+
+  SQL_INSTRUMENTAR=0   desactiva todo (las conexiones se entregan sin envolver)
+  SQL_SLOW_MS=200      umbral del log de consultas lentas, en milisegundos
+  SQL_SLOW_LOG=...     archivo del log de consultas lentas
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+ACTIVO = os.getenv("SQL_INSTRUMENTAR", "1") != "0"
+SLOW_MS = float(os.getenv("SQL_SLOW_MS", "200"))
+SQL_MAX = 1000   # caracteres de la sentencia que se guardan en el log
+
+slow_log = logging.getLogger("semana13.sql_lento")
+if not slow_log.handlers:
+    _archivo = os.getenv("SQL_SLOW_LOG")
+    _handler = logging.FileHandler(_archivo, encoding="utf-8") if _archivo else logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    slow_log.addHandler(_handler)
+    slow_log.setLevel(logging.INFO)
+    slow_log.propagate = False
+
+# totales del proceso (para /stats)
+_lock = threading.Lock()
+_totales = {"requests": 0, "consultas": 0, "lentas": 0, "sql_ms": 0.0, "adquirir_ms": 0.0}
+
+
+def _medidas():
+    """Acumulador del request actual (None fuera de un request)."""
+    if not has_request_context():
+        return None
+    m = g.get("_sql")
+    if m is None:
+        m = g._sql = {"consultas": 0, "sql_ms": 0.0, "filas": 0, "lentas": 0,
+                      "conexiones": 0, "adquirir_ms": 0.0, "cursores": []}
+    return m
+
+
+class _CursorMedido:
+    """Proxy del cursor de mysql.connector que mide cada sentencia."""
+
+    def __init__(self, cur, medidas):
+        self._cur = cur
+        self._m = medidas
+        self._sentencia = None   # [sql, ms, filas] de la última sentencia
+        medidas["cursores"].append(self)
+
+    def _ejecutar(self, operation, llamada):
+        self._terminar()
+        inicio = time.perf_counter()
+        try:
+            return llamada()
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            self._m["consultas"] += 1
+            self._m["sql_ms"] += ms
+            self._sentencia = [operation, ms, 0]
+
+    def execute(self, operation, params=None, **kwargs):
+        return self._ejecutar(operation, lambda: self._cur.execute(operation, params, **kwargs))
+
+    def executemany(self, operation, seq_params):
+        r = self._ejecutar(operation, lambda: self._cur.executemany(operation, seq_params))
+        self._sentencia[2] = max(self._cur.rowcount, 0)
+        return r
+
+    def _leer(self, metodo, *args, una=False):
+        inicio = time.perf_counter()
+        rows = metodo(*args)
+        ms = (time.perf_counter() - inicio) * 1000
+        n = (rows is not None) if una else len(rows)
+        self._m["sql_ms"] += ms
+        self._m["filas"] += n
+        if self._sentencia is not None:
+            self._sentencia[1] += ms
+            self._sentencia[2] += n
+        return rows
+
+    def fetchone(self):
+        return self._leer(self._cur.fetchone, una=True)
+
+    def fetchall(self):
+        return self._leer(self._cur.fetchall)
+
+    def fetchmany(self, size=None):
+        return self._leer(self._cur.fetchmany, *(() if size is None else (size,)))
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def _terminar(self):
+        """Cierra la medición de la sentencia anterior (y la loguea si fue lenta)."""
+        s, self._sentencia = self._sentencia, None
+        if s is None or s[1] < SLOW_MS:
+            return
+        self._m["lentas"] += 1
+        slow_log.info(json.dumps({
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "ms": round(s[1], 1),
+            "filas": s[2],
+            "metodo": request.method,
+            "ruta": request.path,
+            "endpoint": request.endpoint,
+            "sql": " ".join(str(s[0]).split())[:SQL_MAX],
+        }, ensure_ascii=False))
+
+    def close(self):
+        self._terminar()
+        return self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class _ConexionMedida:
+    """Proxy de la conexión: sólo cambia cursor(); el resto pasa directo."""
+
+    def __init__(self, conn, medidas):
+        self._conn = conn
+        self._m = medidas
+
+    def cursor(self, *args, **kwargs):
+        return _CursorMedido(self._conn.cursor(*args, **kwargs), self._m)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._conn.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def medir(conn, adquirir_ms: float):
+    """Envuelve `conn` si hay un request en curso; si no la devuelve tal cual."""
+    if not ACTIVO:
+        return conn
+    m = _medidas()
+    if m is None:
+        return conn
+    m["conexiones"] += 1
+    m["adquirir_ms"] += adquirir_ms
+    return _ConexionMedida(conn, m)
+
+
+def init_app(app):
+    """Registra el header Server-Timing y los totales por request."""
+    if not ACTIVO:
+        return
+
+    @app.before_request
+    def _inicio_request():
+        g._sql_inicio = time.perf_counter()
+
+    @app.after_request
+    def _server_timing(resp):
+        m = g.get("_sql")
+        total_ms = (time.perf_counter() - g.get("_sql_inicio", time.perf_counter())) * 1000
+        metricas = [f"app;dur={total_ms:.1f}"]
+        if m is not None:
+            metricas.append(f'db;dur={m["sql_ms"]:.1f};desc="{m["consultas"]} consultas, {m["filas"]} filas"')
+            metricas.append(f'db-conexion;dur={m["adquirir_ms"]:.1f};desc="{m["conexiones"]} conexiones"')
+        resp.headers.add("Server-Timing", ", ".join(metricas))
+        return resp
+
+    @app.teardown_request
+    def _cerrar_mediciones(exc=None):
+        # con stream_with_context esto corre cuando termina el stream
+        m = g.get("_sql")
+        if m is not None:
+            # cursores que nadie cerró: su última sentencia también cuenta para el log
+            for cur in m["cursores"]:
+                cur._terminar()
+            m["cursores"].clear()
+        with _lock:
+            _totales["requests"] += 1
+            if m is not None:
+                _totales["consultas"] += m["consultas"]
+                _totales["lentas"] += m["lentas"]
+                _totales["sql_ms"] += m["sql_ms"]
+                _totales["adquirir_ms"] += m["adquirir_ms"]
+
+
+def stats() -> dict:
+    with _lock:
+        data = dict(_totales)
+    data["sql_ms"] = round(data["sql_ms"], 1)
+    data["adquirir_ms"] = round(data["adquirir_ms"], 1)
+    data.update(activo=ACTIVO, slow_ms=SLOW_MS)
+    return data
@@ -0,0 +1,131 @@
+# limitador.py
+"""
+Límite de intentos en memoria (token bucket) para /auth/login.
+
+Cada clave ("u:<usuario>@<ip>", "ip:<dirección>") es un balde de `capacidad`
+intentos que se recarga de a uno cada `periodo / capacidad` segundos. Se guarda
+en la forma GCRA: un solo float por clave (el momento en que el balde vuelve a
+estar lleno), en un OrderedDict con un lock (las operaciones son O(1)).
+
+El balde del usuario va junto con la IP: si no, cualquiera podría dejar afuera a
+un usuario real gastándole los intentos desde otra máquina. A cambio, contra un
+mismo usuario desde muchas IPs sólo frena el límite de cada IP.
+
+Las claves quedan en orden de último uso. Una clave con el balde lleno equivale a
+no tenerla: en cada intento se borran las del principio que ya se llenaron (sin
+recorrer las demás) y, pasadas MAX_CLAVES, se descartan las más viejas.
+
+  LOGIN_RATE_USER=5/60    intentos / segundos por usuario (desde una IP)
+  LOGIN_RATE_IP=20/60     intentos / segundos por IP
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MAX_CLAVES = 100_000     # si se supera, se olvidan las usadas hace más tiempo
+
+
+def _tasa(valor: str) -> tuple[int, float]:
+    n, seg = valor.split("/", 1)
+    return int(n), float(seg)
+
+
+class TokenBucket:
+    def __init__(self, capacidad: int, periodo: float):
+        self.capacidad = capacidad
+        self.intervalo = periodo / capacidad                 # segundos por intento
+        self.tolerancia = self.intervalo * (capacidad - 1)   # ráfaga permitida
+        self._lleno_en: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def espera(self, clave: str) -> float:
+        """0 si a `clave` le queda un intento; si no, los segundos hasta el próximo."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._limpiar(ahora)
+            lleno_en = self._lleno_en.get(clave, ahora)
+        return max(lleno_en - ahora - self.tolerancia, 0.0)
+
+    def intentar(self, clave: str) -> float:
+        """Como espera(), pero si hay lugar consume en el mismo paso (bajo un solo lock)."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._limpiar(ahora)
+            espera = max(self._lleno_en.get(clave, ahora) - ahora - self.tolerancia, 0.0)
+            if not espera:
+                self._consumir(clave, ahora)
+        return espera
+
+    def consumir(self, clave: str) -> None:
+        ahora = time.monotonic()
+        with self._lock:
+            self._consumir(clave, ahora)
+
+    def _consumir(self, clave: str, ahora: float) -> None:
+        self._lleno_en[clave] = max(self._lleno_en.get(clave, ahora), ahora) + self.intervalo
+        self._lleno_en.move_to_end(clave)
+        while len(self._lleno_en) > MAX_CLAVES:
+            self._lleno_en.popitem(last=False)
+
+    def olvidar(self, clave: str) -> None:
+        """Devuelve el balde a lleno (p. ej. tras un login correcto)."""
+        with self._lock:
+            self._lleno_en.pop(clave, None)
+
+    def _limpiar(self, ahora: float) -> None:
+        # sólo el principio (las de uso más viejo): cada clave se borra una vez
+        while self._lleno_en:
+            clave, lleno_en = next(iter(self._lleno_en.items()))
+            if lleno_en > ahora:
+                return
+            self._lleno_en.pop(clave, None)
+
+    def stats(self) -> dict:
+        return {"claves": len(self._lleno_en), "capacidad": self.capacidad,
+                "recarga_s": round(self.intervalo, 2)}
+
+
+por_usuario = TokenBucket(*_tasa(os.getenv("LOGIN_RATE_USER", "5/60")))
+por_ip = TokenBucket(*_tasa(os.getenv("LOGIN_RATE_IP", "20/60")))
+
+
+_contadores = {"permitidos": 0, "rechazados": 0}
+# revisar y consumir los dos baldes (y contar) es un solo paso: si no, varios
+# intentos en paralelo pasan todos la revisión antes de que alguno consuma
+_lock = threading.Lock()
+
+
+def _clave_usuario(usuario: str, ip: str) -> str:
+    return f"u:{usuario.lower()}@{ip or '-'}"
+
+
+def intento_login(usuario: str, ip: str) -> float:
+    """
+    Cuenta un intento de login. Sólo se consume si tanto el usuario como la IP
+    tienen lugar; devuelve 0 si se permite o los segundos a esperar.
+    """
+    ku, ki = _clave_usuario(usuario, ip), "ip:" + (ip or "-")
+    with _lock:
+        espera_ip = por_ip.espera(ki)
+        if espera_ip:
+            espera = max(espera_ip, por_usuario.espera(ku))
+        else:
+            espera = por_usuario.intentar(ku)
+        if espera:
+            _contadores["rechazados"] += 1
+            return espera
+        por_ip.consumir(ki)
+        _contadores["permitidos"] += 1
+    return 0.0
+
+
+def login_correcto(usuario: str, ip: str) -> None:
+    """Tras un login válido los fallos anteriores de ese usuario (desde esa IP) no cuentan."""
+    por_usuario.olvidar(_clave_usuario(usuario, ip))
+
+
+def stats() -> dict:
+    with _lock:
+        contadores = dict(_contadores)
+    return {"usuario": por_usuario.stats(), "ip": por_ip.stats(), **contadores}
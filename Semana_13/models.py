@@ -1,6 +1,9 @@
 # models.py (REEMPLAZO COMPLETO)
+import os
 from flask_login import UserMixin
-from conexion import get_connection
+from conexion import get_db
+from cache import TTLCache
+import esquema
 
 # ---------- Utilidades de mapeo ----------
 def _pick(cols: set, candidates: list[str]):
@@ -10,10 +13,7 @@ def _pick(cols: set, candidates: list[str]):
     return None
 
 def _colmap_usuarios(conn):
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SHOW COLUMNS FROM usuarios")
-    cols = {row["Field"] for row in cur.fetchall()}
-    cur.close()
+    cols = esquema.columnas(conn, "usuarios")
     return {
         "id":   _pick(cols, ["id", "id_usuario", "usuario_id", "idUsuario", "user_id", "idUser"]),
         "user": _pick(cols, ["username", "usuario", "user", "login", "mail", "email", "correo", "correo_electronico"]),
@@ -35,57 +35,78 @@ class User(UserMixin):
         # row debe venir aliaseado como id, username, nombre
         return cls(row["id"], row.get("username"), row.get("nombre"))
 
+# ---------- Cache del user_loader ----------
+# El user_loader corre en cada request autenticado; guardamos la fila pública
+# (id, username, nombre) para no ir a MySQL en cada página.
+_user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+)
+
+def invalidar_usuario(user_id=None):
+    """Descarta el usuario del cache (o todo el cache si user_id es None)."""
+    if user_id is None:
+        _user_cache.clear()
+    else:
+        _user_cache.invalidate(str(user_id))
+
+def user_cache_stats():
+    return _user_cache.stats()
+
 # ---------- Consultas usadas por LoginManager ----------
 def get_user_public_by_id(user_id):
     """
     Devuelve el usuario con alias estándar (id, username, nombre)
     sin importar cómo se llamen realmente las columnas.
     """
-    conn = get_connection()
-    try:
-        m = _colmap_usuarios(conn)
-        if not m["id"] or not m["user"]:
-            return None
-        cur = conn.cursor(dictionary=True)
-        sql = f"""
-            SELECT
-                {m['id']}   AS id,
-                {m['user']} AS username,
-                {m['name']} AS nombre
-            FROM usuarios
-            WHERE {m['id']}=%s
-            LIMIT 1
-        """
-        cur.execute(sql, (user_id,))
-        row = cur.fetchone()
-        cur.close()
-        return row
-    finally:
-        conn.close()
+    row = _user_cache.get(str(user_id))
+    if row is not None:
+        return dict(row)
+    row = _fetch_user_public_by_id(user_id)
+    if row is not None:
+        _user_cache.set(str(user_id), dict(row))
+    return row
+
+def _fetch_user_public_by_id(user_id):
+    conn = get_db()
+    m = _colmap_usuarios(conn)
+    if not m["id"] or not m["user"]:
+        return None
+    cur = conn.cursor(dictionary=True)
+    sql = f"""
+        SELECT
+            {m['id']}   AS id,
+            {m['user']} AS username,
+            {m['name']} AS nombre
+        FROM usuarios
+        WHERE {m['id']}=%s
+        LIMIT 1
+    """
+    cur.execute(sql, (user_id,))
+    row = cur.fetchone()
+    cur.close()
+    return row
 
 def get_user_public_by_username(username):
     """
     Útil si en algún lugar necesitas buscar por username/correo.
     También devuelve alias: id, username, nombre.
     """
-    conn = get_connection()
-    try:
-        m = _colmap_usuarios(conn)
-        if not m["id"] or not m["user"]:
-            return None
-        cur = conn.cursor(dictionary=True)
-        sql = f"""
-            SELECT
-                {m['id']}   AS id,
-                {m['user']} AS username,
-                {m['name']} AS nombre
-            FROM usuarios
-            WHERE {m['user']}=%s
-            LIMIT 1
-        """
-        cur.execute(sql, (username,))
-        row = cur.fetchone()
-        cur.close()
-        return row
-    finally:
-        conn.close()
+    conn = get_db()
+    m = _colmap_usuarios(conn)
+    if not m["id"] or not m["user"]:
+        return None
+    cur = conn.cursor(dictionary=True)
+    sql = f"""
+        SELECT
+            {m['id']}   AS id,
+            {m['user']} AS username,
+            {m['name']} AS nombre
+        FROM usuarios
+        WHERE {m['user']}=%s
+        LIMIT 1
+    """
+    cur.execute(sql, (username,))
+    row = cur.fetchone()
+    cur.close()
+    return row
@@ -29,10 +29,34 @@ CREATE TABLE productos (
   categoria_id INT NULL,
   descripcion TEXT,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  -- filtros de listar_productos (categoría, rango de precio, stock bajo, nombre)
+  INDEX idx_productos_categoria (categoria_id),
+  INDEX idx_productos_precio (precio),
+  INDEX idx_productos_stock (stock),
+  INDEX idx_productos_nombre (nombre),
+  -- búsqueda por palabras (/api/v1/buscar)
+  FULLTEXT INDEX ft_productos_texto (nombre, descripcion),
   CONSTRAINT fk_prod_cat FOREIGN KEY (categoria_id)
     REFERENCES categorias(id) ON DELETE SET NULL ON UPDATE CASCADE
 ) ENGINE=InnoDB;
 
+-- búsqueda por palabras en tareas (/api/v1/buscar). proyectos/tareas no se
+-- crean acá: si la tabla existe y todavía no tiene el índice, se agrega sin tocar datos.
+SET @ft_tareas = (
+  SELECT IF(
+    EXISTS (SELECT 1 FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name = 'tareas')
+    AND NOT EXISTS (SELECT 1 FROM information_schema.statistics
+                    WHERE table_schema = DATABASE() AND table_name = 'tareas'
+                      AND index_name = 'ft_tareas_titulo'),
+    'ALTER TABLE tareas ADD FULLTEXT INDEX ft_tareas_titulo (titulo)',
+    'DO 0'
+  )
+);
+PREPARE ft_tareas FROM @ft_tareas;
+EXECUTE ft_tareas;
+DEALLOCATE PREPARE ft_tareas;
+
 INSERT INTO categorias (nombre, descripcion) VALUES
 ('Electrónica','Dispositivos y gadgets'),
 ('Hogar','Artículos para el hogar'),
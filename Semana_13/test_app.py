@@ -0,0 +1,209 @@
+# test_app.py
+import io
+
+import pytest
+
+import esquema
+
+
+@pytest.fixture
+def productos(conexion_falsa):
+    conexion_falsa.db.execute(
+        "CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL UNIQUE, precio REAL, stock INTEGER)")
+    return conexion_falsa.db
+
+
+# ---------- Exportación ----------
+def test_exportar_csv_y_json(cliente, productos):
+    productos.executemany("INSERT INTO productos (nombre, precio, stock) VALUES (?, ?, ?)",
+                          [(f"p{i}", i, i) for i in range(1200)])
+    r = cliente.get("/productos/exportar?formato=csv")
+    lineas = r.get_data(as_text=True).splitlines()
+    assert lineas[0] == "id,nombre,precio,stock,categoria" and len(lineas) == 1201
+    datos = cliente.get("/productos/exportar?formato=json").get_json()
+    assert len(datos) == 1200 and datos[0]["nombre"] == "p0"
+
+
+# ---------- Importación ----------
+def test_importar_lote_con_repetido_guarda_las_validas(cliente, productos):
+    archivo = (io.BytesIO("nombre,precio\nx,1\nx,2\ny,3\n".encode()), "p.csv")
+    cliente.post("/productos/importar", data={"archivo": archivo}, content_type="multipart/form-data")
+    assert [n for (n,) in productos.execute("SELECT nombre FROM productos ORDER BY id")] == ["x", "y"]
+
+
+def test_importar_jsonl_sigue_despues_de_una_linea_invalida(cliente, productos):
+    archivo = (io.BytesIO(b'{"nombre": "a", "precio": 1}\n{mal\n{"nombre": "b", "stock": 2}\n'), "p.jsonl")
+    r = cliente.post("/productos/importar", data={"archivo": archivo}, content_type="multipart/form-data")
+    assert r.status_code == 200
+    assert "JSON inválido" in r.get_data(as_text=True)
+    assert [n for (n,) in productos.execute("SELECT nombre FROM productos ORDER BY id")] == ["a", "b"]
+
+
+def test_importar_reintento_revierte_la_fila_que_falla_al_confirmar(cliente, conexion_falsa, productos):
+    from mysql.connector import errors
+    commits = []
+
+    def commit():
+        commits.append(1)
+        if len(commits) == 2:   # el commit de "y" en el reintento fila por fila
+            raise errors.DatabaseError(msg="se cortó la conexión")
+        conexion_falsa.db.commit()
+    conexion_falsa.commit = commit
+    archivo = (io.BytesIO("nombre\nx\nx\ny\nz\n".encode()), "p.csv")
+    r = cliente.post("/productos/importar", data={"archivo": archivo}, content_type="multipart/form-data")
+    assert "se cortó la conexión" in r.get_data(as_text=True)
+    assert [n for (n,) in productos.execute("SELECT nombre FROM productos ORDER BY id")] == ["x", "z"]
+
+
+def test_importar_categoria_id_no_numerico(cliente, productos):
+    productos.execute("ALTER TABLE productos ADD COLUMN categoria_id INTEGER")
+    archivo = (io.BytesIO("nombre,categoria_id\na,uno\nb,2\n".encode()), "p.csv")
+    r = cliente.post("/productos/importar", data={"archivo": archivo}, content_type="multipart/form-data")
+    assert "categoria_id inválido: uno" in r.get_data(as_text=True)
+    assert productos.execute("SELECT nombre, categoria_id FROM productos").fetchall() == [("b", 2)]
+
+
+def test_import_rows_da_tuplas_con_error():
+    from werkzeug.datastructures import FileStorage
+    from app import _import_rows
+    archivo = FileStorage(io.BytesIO(b'{"nombre": "a"}\n{mal\n'), "p.jsonl")
+    filas = list(_import_rows(archivo))
+    assert filas[0] == (1, {"nombre": "a"}, None)
+    assert filas[1][:2] == (2, None) and filas[1][2].startswith("JSON inválido")
+
+
+# ---------- API JSON ----------
+@pytest.fixture
+def categorias(conexion_falsa):
+    conexion_falsa.db.execute("CREATE TABLE categorias (id INTEGER PRIMARY KEY, nombre TEXT, descripcion TEXT)")
+    conexion_falsa.db.execute("INSERT INTO categorias VALUES (1, 'libros', NULL)")
+    return conexion_falsa.db
+
+
+def test_api_lista_crea_y_borra(cliente, categorias):
+    r = cliente.post("/api/v1/categorias", json={"nombre": "revistas"})
+    assert r.status_code == 201
+    nuevo = r.get_json()["id"]
+    assert sorted(c["nombre"] for c in cliente.get("/api/v1/categorias").get_json()["data"]) == ["libros", "revistas"]
+    assert cliente.delete(f"/api/v1/categorias/{nuevo}").status_code == 200
+    assert cliente.get(f"/api/v1/categorias/{nuevo}").status_code == 404
+
+
+@pytest.mark.parametrize("metodo", ["put", "patch", "delete"])
+def test_api_item_inexistente_da_404(cliente, categorias, metodo):
+    r = getattr(cliente, metodo)("/api/v1/categorias/99", json={"nombre": "x"})
+    assert r.status_code == 404
+    assert r.get_json()["ok"] is False
+
+
+def test_api_item_patch(cliente, categorias):
+    r = cliente.patch("/api/v1/categorias/1", json={"nombre": "revistas"})
+    assert r.status_code == 200
+    assert cliente.get("/api/v1/categorias/1").get_json()["data"]["nombre"] == "revistas"
+
+
+def test_api_etag_cubre_la_pagina(cliente, categorias):
+    categorias.execute("INSERT INTO categorias VALUES (2, 'discos', NULL)")
+    r = cliente.get("/api/v1/categorias?limit=2")
+    assert r.headers["ETag"] != cliente.get("/api/v1/categorias?limit=5").headers["ETag"]
+    r2 = cliente.get("/api/v1/categorias?limit=2", headers={"If-None-Match": r.headers["ETag"]})
+    assert r2.status_code == 304 and r2.get_data() == b""
+
+
+# ---------- Búsqueda por texto ----------
+@pytest.fixture
+def productos_con_descripcion(productos):
+    productos.execute("ALTER TABLE productos ADD COLUMN descripcion TEXT")
+    productos.executemany("INSERT INTO productos (nombre, descripcion) VALUES (?, ?)",
+                          [("teclado usb", "negro"), ("mouse", "usb inalámbrico"), ("monitor", "hdmi")])
+    return productos
+
+
+def test_buscar_usa_las_columnas_exactas_del_indice(cliente, conexion_falsa, productos_con_descripcion):
+    # índice sólo sobre nombre aunque la tabla tenga descripción: MATCH(nombre, descripcion) daría 1191
+    conexion_falsa.fulltext["productos"] = {"ft_productos_nombre": ["nombre"]}
+    datos = cliente.get("/api/v1/buscar?q=usb").get_json()
+    assert datos["modo"] == "fulltext"
+    assert [p["nombre"] for p in datos["data"]] == ["teclado usb"]
+    conexion_falsa.fulltext["productos"]["ft_productos_texto"] = ["nombre", "descripcion"]
+    esquema.invalidar()
+    datos = cliente.get("/api/v1/buscar?q=usb").get_json()
+    assert datos["modo"] == "fulltext"
+    assert sorted(p["nombre"] for p in datos["data"]) == ["mouse", "teclado usb"]
+
+
+def test_buscar_sin_indice_usa_like(cliente, productos_con_descripcion):
+    datos = cliente.get("/api/v1/buscar?q=hdm").get_json()
+    assert datos["modo"] == "like"
+    assert [p["nombre"] for p in datos["data"]] == ["monitor"]
+
+
+# ---------- Filtros de listas ----------
+def test_filtro_q_es_prefijo_y_escapa_comodines(cliente, productos):
+    productos.executemany("INSERT INTO productos (nombre) VALUES (?)",
+                          [("cable usb",), ("usb cable",), ("100% algodón",), ("1000 hojas",), ("a_b",), ("axb",)])
+    nombres = lambda q: sorted(p["nombre"] for p in cliente.get("/api/v1/productos", query_string={"q": q}).get_json()["data"])
+    assert nombres("cab") == ["cable usb"]
+    assert nombres("100%") == ["100% algodón"]
+    assert nombres("a_") == ["a_b"]
+    assert nombres("%") == []
+
+
+# ---------- Paginación por cursor ----------
+def _pagina(db, **args):
+    """Una página de `t` ordenada por (nombre, id) como listar_categorias."""
+    from app import _keyset, _page_args, _page_rows, app
+    with app.test_request_context("/", query_string=args):
+        pg = _page_args()
+        cursor = pg["after"] if pg["after"] is not None else pg["before"]
+        sort_val = db.execute("SELECT nombre FROM t WHERE id = ?", (cursor,)).fetchone()[0] if cursor else None
+        where, params, order = _keyset(pg, "id", desc=False, sort_col="nombre", sort_val=sort_val)
+        sql = f"SELECT id, nombre FROM t {'WHERE ' + where if where else ''} ORDER BY {order} LIMIT {pg['limit'] + 1}"
+        filas = [{"id": i, "nombre": n} for i, n in db.execute(sql.replace("%s", "?"), params)]
+        return _page_rows(filas, pg)
+
+
+def test_keyset_recorre_ida_y_vuelta_con_empates(conexion_falsa):
+    db = conexion_falsa.db
+    db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, nombre TEXT)")
+    db.executemany("INSERT INTO t (nombre) VALUES (?)", [(n,) for n in "bcabacbbaca"])
+    esperado = [i for i, _ in db.execute("SELECT id, nombre FROM t ORDER BY nombre, id")]
+    vistos, page = [], {"next": None}
+    while True:
+        filas, page = _pagina(db, limit=3, **({"after": page["next"]} if page["next"] else {}))
+        vistos += [f["id"] for f in filas]
+        if not page["next"]:
+            break
+    assert vistos == esperado
+    hacia_atras = [f["id"] for f in filas]
+    while page["prev"]:
+        filas, page = _pagina(db, limit=3, before=page["prev"])
+        hacia_atras = [f["id"] for f in filas] + hacia_atras
+    assert hacia_atras == esperado
+
+
+def test_cursor_invalido_da_la_primera_pagina(cliente, categorias):
+    categorias.execute("INSERT INTO categorias VALUES (2, 'discos', NULL)")
+    primera = cliente.get("/api/v1/categorias?limit=1").get_json()
+    assert cliente.get("/api/v1/categorias?limit=1&after=abc").get_json() == primera
+    assert cliente.get("/api/v1/categorias?limit=1&before=abc").get_json() == primera
+    assert cliente.get("/api/v1/categorias?limit=1&after=1").get_json()["data"] == []   # orden descendente
+
+
+def test_filtro_invalido_no_pasa_a_los_links(cliente, productos):
+    productos.executemany("INSERT INTO productos (nombre, precio) VALUES (?, ?)", [("a", 1), ("b", 2)])
+    html = cliente.get("/productos?precio_min=abc&q=a&limit=1").get_data(as_text=True)
+    assert "Filtro inválido" in html
+    link = next(l for l in html.splitlines() if "Siguientes" in l)
+    assert "limit=1" in link and "precio_min" not in link and "q=" not in link
+
+
+# ---------- Admin ----------
+def test_refrescar_esquema_solo_admin(cliente, monkeypatch):
+    import app as modulo
+    from types import SimpleNamespace
+    monkeypatch.setattr(modulo, "ADMIN_USERS", {"ana"})
+    monkeypatch.setattr(modulo, "current_user", SimpleNamespace(username="beto"))
+    assert cliente.post("/admin/esquema/refrescar").status_code == 403
+    monkeypatch.setattr(modulo, "current_user", SimpleNamespace(username="Ana"))
+    assert cliente.post("/admin/esquema/refrescar").get_json()["ok"] is True
@@ -0,0 +1,40 @@
+# test_cache.py
+import time
+
+from cache import TTLCache, VersionedCache
+
+
+def test_ttlcache_lru_y_expiracion(monkeypatch):
+    ahora = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: ahora[0])
+    c = TTLCache(maxsize=2, ttl=10)
+    c.set("a", 1); c.set("b", 2)
+    assert c.get("a") == 1
+    c.set("c", 3)                     # saca a "b", el menos usado
+    assert c.get("b") is None and c.get("a") == 1
+    ahora[0] += 11
+    assert c.get("a") is None
+    assert c.stats()["hits"] == 2
+
+
+def test_versioned_cache_invalidate():
+    c = VersionedCache(ttl=60)
+    cargas = []
+    cargar = lambda: cargas.append(1) or len(cargas)
+    assert c.get_or_load("cat", cargar) == 1
+    assert c.get_or_load("cat", cargar) == 1
+    c.invalidate("cat")
+    assert c.get_or_load("cat", cargar) == 2
+    c.invalidate()
+    assert c.get_or_load("cat", cargar) == 3
+
+
+def test_carga_vieja_no_pisa_una_invalidacion():
+    c = VersionedCache(ttl=60)
+
+    def cargar_mientras_invalidan():
+        c.invalidate("cat")           # otro hilo cambia la tabla durante la carga
+        return "viejo"
+
+    assert c.get_or_load("cat", cargar_mientras_invalidan) == "viejo"
+    assert c.get_or_load("cat", lambda: "nuevo") == "nuevo"
@@ -0,0 +1,93 @@
+# test_conexion.py
+import logging
+import queue
+import threading
+import time
+
+import pytest
+from flask import Flask, g
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
+
+import conexion
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """_Pool sin MySQL: el pool base sólo encola y desencola objetos."""
+    def get_connection(self):
+        try:
+            return self._cnx_queue.get(block=False)
+        except queue.Empty:
+            raise PoolError("pool exhausted")
+
+    def add_connection(self, cnx=None):
+        self._cnx_queue.put(cnx or object(), block=False)
+
+    monkeypatch.setattr(pooling.MySQLConnectionPool, "get_connection", get_connection)
+    monkeypatch.setattr(pooling.MySQLConnectionPool, "add_connection", add_connection)
+    p = conexion._Pool(0.5, pool_name="prueba", pool_size=1)
+    p.add_connection()
+    return p
+
+
+def test_espera_hasta_que_se_devuelve(pool):
+    cnx = pool.get_connection()
+    threading.Timer(0.05, pool.add_connection, [cnx]).start()
+    inicio = time.monotonic()
+    assert pool.get_connection() is cnx
+    assert time.monotonic() - inicio < 0.4
+    s = pool.stats()
+    assert s["prestadas"] == 2 and s["esperas"] == 1 and s["en_uso"] == 1 and s["max_en_uso"] == 1
+    assert s["espera_total_ms"] > 0 and s["libres"] == 0
+
+
+def test_timeout_sin_conexion_libre(pool):
+    pool.timeout = 0.05
+    pool.get_connection()
+    with pytest.raises(PoolError, match="agotado"):
+        pool.get_connection()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_varios_esperando_se_reparten_las_devoluciones(pool):
+    pool.timeout = 2
+    cnx = pool.get_connection()
+    obtenidas = []
+
+    def usar():
+        c = pool.get_connection()
+        obtenidas.append(c)
+        time.sleep(0.01)
+        pool.add_connection(c)
+
+    hilos = [threading.Thread(target=usar) for _ in range(4)]
+    for h in hilos: h.start()
+    pool.add_connection(cnx)
+    for h in hilos: h.join()
+    assert obtenidas == [cnx] * 4
+    assert pool.stats()["en_uso"] == 0 and pool.stats()["timeouts"] == 0
+
+
+# ---------- Rastreador de fugas ----------
+class _ConexionSuelta:
+    def __init__(self, abierta=True):
+        self.abierta = abierta
+
+    def is_connected(self):
+        return self.abierta
+
+    def close(self):
+        self.abierta = False
+
+
+def test_close_db_cierra_y_avisa_las_fugas(caplog):
+    app = Flask(__name__)
+    olvidada, cerrada, del_request = _ConexionSuelta(), _ConexionSuelta(abierta=False), _ConexionSuelta()
+    del_request.in_transaction = False
+    with app.test_request_context(), caplog.at_level(logging.WARNING):
+        g.db = del_request
+        g._db_prestadas = [(olvidada, "  File vista.py, line 1"), (cerrada, "otra"), (del_request, "get_db")]
+        conexion.close_db()
+    assert not olvidada.abierta and not del_request.abierta
+    assert len(caplog.records) == 1 and "vista.py" in caplog.text
@@ -0,0 +1,31 @@
+# test_esquema.py
+import esquema
+
+
+def test_una_sola_consulta_para_todas_las_tablas(conexion_falsa):
+    conexion_falsa.db.execute("CREATE TABLE productos (id INTEGER PRIMARY KEY, nombre TEXT)")
+    conexion_falsa.db.execute("CREATE TABLE categorias (id INTEGER PRIMARY KEY)")
+    cargas = esquema.stats()["cargas"]
+    assert esquema.tabla_existe(conexion_falsa, "productos")
+    assert esquema.columnas(conexion_falsa, "productos") == {"id", "nombre"}
+    assert not esquema.tabla_existe(conexion_falsa, "tareas")
+    assert esquema.stats()["cargas"] == cargas + 1
+
+
+def test_invalidar_relee_el_esquema(conexion_falsa):
+    conexion_falsa.db.execute("CREATE TABLE productos (id INTEGER PRIMARY KEY)")
+    assert esquema.columnas(conexion_falsa, "productos") == {"id"}
+    conexion_falsa.db.execute("ALTER TABLE productos ADD COLUMN precio REAL")
+    assert esquema.columnas(conexion_falsa, "productos") == {"id"}
+    esquema.invalidar()
+    assert esquema.columnas(conexion_falsa, "productos") == {"id", "precio"}
+
+
+def test_tabla_creada_despues_del_snapshot(conexion_falsa):
+    assert not esquema.tabla_existe(conexion_falsa, "tareas")
+    cargas = esquema.stats()["cargas"]
+    assert not esquema.tabla_existe(conexion_falsa, "tareas")   # sigue sin existir: no se recarga
+    conexion_falsa.db.execute("CREATE TABLE tareas (id INTEGER PRIMARY KEY, titulo TEXT)")
+    assert esquema.tabla_existe(conexion_falsa, "tareas")
+    assert esquema.columnas(conexion_falsa, "tareas") == {"id", "titulo"}
+    assert esquema.stats()["cargas"] == cargas + 1
@@ -0,0 +1,42 @@
+# test_hashing.py
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import hashing
+
+
+def test_hashear_y_verificar():
+    h = hashing.hashear("secreto")
+    assert h.startswith(hashing.PREFIJO + "$")
+    assert hashing.verificar(h, "secreto")
+    assert not hashing.verificar(h, "otra")
+    assert not hashing.necesita_rehash(h)
+
+
+def test_texto_plano_se_acepta_y_pide_rehash():
+    assert hashing.verificar("secreto", "secreto")
+    assert hashing.necesita_rehash("secreto")
+
+
+def test_un_hash_no_se_compara_como_texto_plano():
+    otro = "argon2$algo$abc"
+    assert not hashing.verificar(otro, otro)
+    viejo = generate_password_hash("x", "pbkdf2:sha256:1000")
+    assert not hashing.verificar(viejo, viejo)
+    assert hashing.verificar(viejo, "x") and hashing.necesita_rehash(viejo)
+
+
+def test_necesita_rehash_no_calcula_hashes(monkeypatch):
+    monkeypatch.setattr(hashing, "generate_password_hash", lambda *a: pytest.fail("hash en el hilo del request"))
+    assert hashing.necesita_rehash("scrypt:16384:8:1$sal$abc")
+
+
+def test_cola_llena_rechaza(monkeypatch):
+    if hashing.WORKERS <= 0:
+        pytest.skip("HASH_WORKERS=0")
+    monkeypatch.setattr(hashing, "_cupos", threading.BoundedSemaphore(1))
+    hashing._cupos.acquire()
+    with pytest.raises(hashing.HashOcupado):
+        hashing.hashear("x")
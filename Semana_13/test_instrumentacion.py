@@ -0,0 +1,56 @@
+# test_instrumentacion.py
+import json
+
+import pytest
+from flask import Flask
+
+import instrumentacion
+from conftest import ConexionFalsa
+
+
+@pytest.fixture
+def app_medida():
+    if not instrumentacion.ACTIVO:
+        pytest.skip("SQL_INSTRUMENTAR=0")
+    app = Flask(__name__)
+    instrumentacion.init_app(app)
+    conn = ConexionFalsa()
+    conn.db.executescript("CREATE TABLE t (x INTEGER); INSERT INTO t VALUES (1), (2), (3);")
+
+    @app.route("/")
+    def vista():
+        medida = instrumentacion.medir(conn, 2.5)
+        cur = medida.cursor()
+        cur.execute("SELECT x FROM t WHERE x > %s", (0,))
+        filas = cur.fetchall()
+        cur.execute("SELECT x FROM t")
+        cur.fetchone()
+        cur.close()
+        return str(len(filas))
+
+    return app
+
+
+def test_server_timing(app_medida):
+    r = app_medida.test_client().get("/")
+    timing = r.headers["Server-Timing"]
+    assert "app;dur=" in timing
+    assert 'desc="2 consultas, 4 filas"' in timing
+    assert 'db-conexion;dur=2.5;desc="1 conexiones"' in timing
+
+
+def test_log_de_consultas_lentas_sin_parametros(app_medida, monkeypatch):
+    lineas = []
+    monkeypatch.setattr(instrumentacion, "SLOW_MS", 0.0)
+    monkeypatch.setattr(instrumentacion.slow_log, "info", lineas.append)
+    antes = instrumentacion.stats()["lentas"]
+    app_medida.test_client().get("/")
+    registros = [json.loads(l) for l in lineas]
+    assert [r["sql"] for r in registros] == ["SELECT x FROM t WHERE x > %s", "SELECT x FROM t"]
+    assert registros[0]["filas"] == 3 and registros[0]["ruta"] == "/"
+    assert instrumentacion.stats()["lentas"] == antes + 2
+
+
+def test_fuera_de_un_request_no_envuelve():
+    conn = ConexionFalsa()
+    assert instrumentacion.medir(conn, 0.0) is conn
@@ -0,0 +1,74 @@
+# test_limitador.py
+import threading
+import time
+
+import limitador
+from limitador import TokenBucket
+
+
+def _gastar(balde, clave, n):
+    for _ in range(n):
+        assert balde.espera(clave) == 0
+        balde.consumir(clave)
+
+
+def test_rafaga_y_espera():
+    balde = TokenBucket(3, 30)
+    _gastar(balde, "k", 3)
+    assert 9 < balde.espera("k") <= 10
+    balde.olvidar("k")
+    assert balde.espera("k") == 0
+
+
+def test_limpieza_no_recorre_todas_las_claves(monkeypatch):
+    balde = TokenBucket(2, 2)
+    ahora = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: ahora[0])
+    for i in range(100):
+        balde.consumir(f"k{i}")
+    ahora[0] += 1.5   # las 100 ya se recargaron
+    balde.consumir("nueva")
+    balde.espera("x")
+    assert list(balde._lleno_en) == ["nueva"]
+
+
+def test_max_claves_descarta_las_mas_viejas(monkeypatch):
+    monkeypatch.setattr(limitador, "MAX_CLAVES", 3)
+    balde = TokenBucket(1, 60)
+    for clave in "abcd":
+        balde.consumir(clave)
+    assert list(balde._lleno_en) == ["b", "c", "d"]
+
+
+def test_intentos_de_otra_ip_no_bloquean_al_usuario(monkeypatch):
+    monkeypatch.setattr(limitador, "por_usuario", TokenBucket(2, 60))
+    monkeypatch.setattr(limitador, "por_ip", TokenBucket(100, 60))
+    assert limitador.intento_login("Ana", "1.1.1.1") == 0
+    assert limitador.intento_login("ana", "1.1.1.1") == 0
+    assert limitador.intento_login("ana", "1.1.1.1") > 0
+    assert limitador.intento_login("ana", "2.2.2.2") == 0
+    limitador.login_correcto("ana", "1.1.1.1")
+    assert limitador.intento_login("ana", "1.1.1.1") == 0
+
+
+def test_intentar_revisa_y_consume_en_un_paso():
+    balde = TokenBucket(2, 60)
+    assert balde.intentar("k") == 0 and balde.intentar("k") == 0
+    assert balde.intentar("k") > 0
+    assert balde.intentar("k") <= 30   # rechazar no consume
+
+
+def test_intentos_en_paralelo_no_superan_el_limite(monkeypatch):
+    monkeypatch.setattr(limitador, "por_usuario", TokenBucket(5, 60))
+    monkeypatch.setattr(limitador, "por_ip", TokenBucket(100, 60))
+    monkeypatch.setattr(limitador, "_contadores", {"permitidos": 0, "rechazados": 0})
+    largada = threading.Barrier(20)
+
+    def intentar():
+        largada.wait()
+        limitador.intento_login("ana", "1.1.1.1")
+
+    hilos = [threading.Thread(target=intentar) for _ in range(20)]
+    for h in hilos: h.start()
+    for h in hilos: h.join()
+    assert limitador.stats()["permitidos"] == 5 and limitador.stats()["rechazados"] == 15
@@ -0,0 +1,56 @@
+# wsgi.py
+"""
+Entrada de producción (sin debugger, config desde .env).
+
+  waitress:  python wsgi.py                       (WEB_THREADS hilos)
+  gunicorn:  gunicorn "wsgi:create_app()"         (lee gunicorn.conf.py)
+
+El pool de conexiones y los caches (esquema, usuarios) son seguros entre hilos
+y se crean perezosamente, así que cada worker/proceso arma los suyos.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def create_app():
+    secret = os.getenv("SECRET_KEY")
+    if not secret:
+        raise RuntimeError("Falta SECRET_KEY en .env (obligatoria en producción)")
+
+    from app import app
+    app.config.update(
+        SECRET_KEY=secret,
+        DEBUG=False,
+        TESTING=False,
+        SESSION_COOKIE_HTTPONLY=True,
+        SESSION_COOKIE_SAMESITE="Lax",
+        SESSION_COOKIE_SECURE=os.getenv("SESSION_COOKIE_SECURE", "0") == "1",
+    )
+
+    if os.getenv("PROXY_FIX", "0") == "1":
+        # detrás de nginx: request.remote_addr (límite de login por IP) sale de X-Forwarded-For
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1)
+
+    threads = int(os.getenv("WEB_THREADS", "4"))
+    pool = int(os.getenv("DB_POOL_SIZE", "5"))
+    if 0 < pool < threads:
+        # cada hilo puede tener una conexión prestada a la vez
+        app.logger.warning("WEB_THREADS=%s > DB_POOL_SIZE=%s: habrá esperas por conexión", threads, pool)
+    return app
+
+
+if __name__ == "__main__":
+    app = create_app()
+    host = os.getenv("WEB_HOST", "0.0.0.0")
+    port = int(os.getenv("WEB_PORT", "8000"))
+    threads = int(os.getenv("WEB_THREADS", "4"))
+    try:
+        from waitress import serve
+    except ImportError:
+        # sin waitress: servidor de werkzeug multihilo, sin debugger ni reloader
+        app.run(host=host, port=port, debug=False, threaded=True, use_reloader=False)
+    else:
+        serve(app, host=host, port=port, threads=threads)